@@ -0,0 +1,256 @@
+"""Run many copies of a zone, differing only in parameter values, in lockstep."""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .Field import FieldState, FieldParams, update_SWD, required_water
+from .Manager import Manager
+from .Zone import FarmZone
+from .data_interface import EPOCH_ORDINAL
+
+
+_AREA = FieldState.attributes.index('irrigated_area')
+
+
+class ZoneBatch(object):
+
+    """A collection of zones advanced together, one day at a time.
+
+    Zones represent the same farm (the same fields and water sources,
+    sharing climate data) under different parameter samples, e.g. as
+    built for each row of a sample matrix.
+
+    Field state of all zones is held in a single array with a leading
+    sample dimension (samples x state attributes x fields), with the
+    state of each zone a view onto it. Each day, soil water deficits of
+    all samples are updated together and the samples where a management
+    decision can occur are found with array operations. Management is
+    then applied to those samples only, with their irrigation LPs
+    solved as a batch (see `Manager.solve_batch()`).
+
+    Results match those of running each zone separately with `FarmZone.run()`.
+    """
+
+    def __init__(self, zones: List[FarmZone]):
+        """
+        Parameters
+        ----------
+        * zones : List[FarmZone], one zone for each sample
+        """
+        if len(zones) == 0:
+            raise ValueError("At least one zone is required")
+
+        first = zones[0]
+        f_names = [f.name for f in first.fields]
+        ws_names = list(first.water_sources)
+        for z in zones[1:]:
+            if z.climate is not first.climate:
+                raise ValueError("Zones in a batch must share climate data")
+
+            if ([f.name for f in z.fields] != f_names) or (list(z.water_sources) != ws_names):
+                raise ValueError("Zones in a batch must have the same fields and water sources")
+        # End for
+
+        self.zones = list(zones)
+        self.climate = first.climate
+
+        # Each zone's field state becomes a view onto the batch state
+        self._state = FieldState.stack([z._field_state for z in zones])
+        self.values = self._state.values
+
+        # Crop and irrigation attributes of each sample's fields, 
+        # stacked from those held by each zone (see `_field_params()`)
+        self._zone_params = [None] * len(zones)
+        self._params = None
+
+        # Season attributes of each field, by sample (see `_sync()`)
+        shape = (len(zones), len(f_names))
+        self._sow = np.zeros(shape)
+        self._harvest = np.zeros(shape)
+        self._plant_md = np.zeros(shape, dtype=np.int64)
+
+        # Whether each sample has water to irrigate with
+        self._can_irrigate = np.zeros(len(zones), dtype=bool)
+
+        for i in range(len(zones)):
+            self._sync(i)
+        # End for
+    # End __init__()
+
+    def __len__(self):
+        return len(self.zones)
+    # End __len__()
+
+    def state(self, attr: str) -> np.ndarray:
+        """Field state for all samples (samples x fields), see `FieldState.attributes`."""
+        return self.values[:, FieldState.attributes.index(attr)]
+    # End state()
+
+    @property
+    def allocation(self) -> np.ndarray:
+        """Remaining allocation of each sample (samples x water sources)."""
+        return np.array([[w.allocation for w in z.water_sources.values()]
+                         for z in self.zones])
+    # End allocation()
+
+    @property
+    def irrigated_volume(self) -> np.ndarray:
+        """Volume of water applied to each field this season (samples x fields)."""
+        return np.array([[f.irrigated_volume for f in z.fields] for z in self.zones])
+    # End irrigated_volume()
+
+    def _sync(self, i: int):
+        """Gather season attributes for the fields of a sample.
+
+        Needed after management, as seasons begin and end, crops change
+        and allocations are used.
+        """
+        zone = self.zones[i]
+        self._can_irrigate[i] = any(w.allocation != 0.0 for w in zone.water_sources.values()) \
+            and not all(f.irrigation.name == 'dryland' for f in zone.fields)
+
+        for j, f in enumerate(zone.fields):
+            crop = f.crop
+            harvest = f.harvest_ordinal
+            self._sow[i, j] = f.sow_ordinal
+            self._harvest[i, j] = np.nan if harvest is None else harvest
+            self._plant_md[i, j] = crop.plant_month_day[0] * 100 + crop.plant_month_day[1]
+        # End for
+    # End _sync()
+
+    def _field_params(self) -> FieldParams:
+        """Crop and irrigation attributes for all samples, restacked when any zone's change."""
+        params = [z._current_field_params() for z in self.zones]
+        if any(a is not b for a, b in zip(params, self._zone_params)):
+            self._params = FieldParams.stack(params)
+            self._zone_params = params
+        # End if
+
+        return self._params
+    # End _field_params()
+
+    def update_SWD(self, rainfall: np.ndarray, ET: np.ndarray):
+        """Update soil water deficit of all fields, for all samples.
+
+        Parameters
+        ----------
+        * rainfall : np.ndarray, rainfall across timestep for each field in mm
+        * ET : np.ndarray, evapotranspiration across timestep for each field in mm
+        """
+        update_SWD(self._state, rainfall, ET)
+    # End update_SWD()
+
+    def calc_required_water(self, t: int) -> np.ndarray:
+        """Water required by each field for all samples (samples x fields), in mm.
+
+        See `FarmZone.calc_required_water()`.
+        """
+        return required_water(self._state, self._field_params(), t)
+    # End calc_required_water()
+
+    def needs_management(self, t: int, month_day: int) -> np.ndarray:
+        """Determine the samples where a management decision can occur.
+
+        See `FarmZone.needs_management()`. In-season days where water is
+        required are skipped for samples with no water to irrigate with, 
+        as management has no effect.
+
+        Parameters
+        ----------
+        * t : int, integer day ordinal
+        * month_day : int, month and day of `t`, as `month * 100 + day`
+
+        Returns
+        ---------
+        * np.ndarray : positions of samples needing management
+        """
+        sow, harvest = self._sow, self._harvest
+        fallow = np.isnan(harvest)
+        with np.errstate(invalid='ignore'):
+            needed = fallow & (self._plant_md == month_day)
+            needed |= ~fallow & ((t == sow) | (t == harvest))
+
+            mid_season = ~fallow & (t > sow) & (t < harvest) & (self.values[:, _AREA] != 0.0)
+            mid_season &= self._can_irrigate[:, None]
+            if mid_season.any():
+                needed |= mid_season & (self.calc_required_water(t) > 0.0)
+        # End with
+
+        return np.flatnonzero(needed.any(axis=1))
+    # End needs_management()
+
+    def run(self, farmer: Manager, time_steps=None,
+            on_date: Optional[Dict] = None) -> List[List[Dict]]:
+        """Run all samples across a sequence of time steps.
+
+        Components are frozen before the run (see `FarmZone.freeze()`).
+
+        Parameters
+        ----------
+        * farmer : Manager, used to manage all samples
+        * time_steps : DatetimeIndex, consecutive days to run.
+                       Defaults to all time steps in the climate data.
+        * on_date : Dict[Tuple[int, int], Callable], functions to call with
+                    (zone, datetime) for each sample on a given (month, day),
+                    see `FarmZone.run()`
+
+        Returns
+        ---------
+        * List[List[Dict]] : for each sample, results for each time step
+                             where harvests occurred
+        """
+        climate = self.climate
+        if time_steps is None:
+            time_steps = climate.time_steps
+
+        on_date = {} if on_date is None else on_date
+        on_md = {m * 100 + d: func for (m, d), func in on_date.items()}
+
+        zones = self.zones
+        for i, z in enumerate(zones):
+            z.freeze()
+            self._sync(i)
+        # End for
+
+        days = time_steps.values.astype('datetime64[D]').astype(np.int64)
+        ordinals = (days + EPOCH_ORDINAL).tolist()
+        md_list = ((time_steps.month.values * 100) + time_steps.day.values).tolist()
+        rain_cols, et_cols = zones[0]._field_climate_cols()
+
+        results = [[] for _ in zones]
+        for k, t in enumerate(ordinals):
+            md = md_list[k]
+            func = on_md.get(md)
+            if func is not None:
+                for i, z in enumerate(zones):
+                    func(z, time_steps[k])
+                    self._sync(i)
+                # End for
+            # End if
+
+            row = climate.values[climate.time_index(t)]
+            self.update_SWD(row[rain_cols], row[et_cols])
+
+            active = self.needs_management(t, md).tolist()
+            if not active:
+                continue
+
+            # Irrigation LPs for all samples needing management are solved together
+            setups = [farmer.irrigation_problem(zones[i], t) for i in active]
+            solved = iter(farmer.solve_batch([p for p, _, _ in setups if p is not None]))
+            for i, (problem, primals, cost_per_ML) in zip(active, setups):
+                if problem is not None:
+                    primals = next(solved)
+
+                res = zones[i].manage(farmer, t, irrigation=(primals, cost_per_ML))
+                if res is not None:
+                    results[i].append(res)
+
+                self._sync(i)
+            # End for
+        # End for
+
+        return results
+    # End run()
+
+# End ZoneBatch()
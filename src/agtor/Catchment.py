@@ -1,14 +1,344 @@
+"""A catchment made up of farm zones, optionally run across worker processes."""
+from typing import Dict, List, Optional
+from copy import copy
+from multiprocessing import cpu_count, get_context
+
+import numpy as np
+from pebble import ProcessPool
+
+from .data_interface import EPOCH_ORDINAL
+
+
+class ZoneCoupling(object):
+
+    """Exchange of state between zones at the end of each time step.
+
+    Subclass to couple zones, e.g. to transfer water between them.
+    After every zone has been stepped, `collect()` is called for each
+    zone and the collected states given to `exchange()`, which determines
+    updates to apply to zones with `apply()` before their next time step.
+
+    Couplings are sent to worker processes, so must be defined at
+    module level. `exchange()` is called in the main process.
+    """
+
+    def collect(self, zone, dt: int) -> object:
+        """State of a zone to share, after the zone is stepped."""
+        return None
+    # End collect()
+
+    def exchange(self, states: Dict[str, object], dt: int) -> Dict[str, object]:
+        """Updates for zones, by zone name, given the state of all zones."""
+        return {}
+    # End exchange()
+
+    def apply(self, zone, update: object, dt: int):
+        """Apply an update to a zone, before its next time step."""
+        pass
+    # End apply()
+
+# End ZoneCoupling()
+
+
+class _ZoneGroup(object):
+
+    """Zones stepped together, one day at a time, within a process."""
+
+    def __init__(self, zones: List, managers: Dict, coupling: Optional[ZoneCoupling],
+                 on_date: Dict):
+        self.zones = zones
+        self.managers = managers
+        self.coupling = coupling
+        self.on_md = {m * 100 + d: func for (m, d), func in on_date.items()}
+        self.results = {z.name: [] for z in zones}
+
+        for z in zones:
+            z.freeze()
+        # End for
+    # End __init__()
+
+    def step(self, t: int, timestamp, month_day: int, updates: Dict) -> Dict:
+        """Step all zones, returning the state of each to share (see `ZoneCoupling`)."""
+        coupling = self.coupling
+        func = self.on_md.get(month_day)
+        states = {}
+        for z in self.zones:
+            if z.name in updates:
+                coupling.apply(z, updates[z.name], t)
+
+            if func is not None:
+                func(z, timestamp)
+
+            res = z.run_timestep(self.managers[z.name], t)
+            if res is not None:
+                self.results[z.name].append(res)
+
+            if coupling is not None:
+                states[z.name] = coupling.collect(z, t)
+        # End for
+
+        return states
+    # End step()
+
+    def final_state(self) -> tuple:
+        """Results, zones (without climate data) and managers of the group."""
+        return self.results, _detach_climate(self.zones), self.managers
+    # End final_state()
+
+# End _ZoneGroup()
+
+
+def _detach_climate(zones: List) -> List:
+    """Shallow copies of zones without climate data, so that it is not sent between processes."""
+    detached = []
+    for z in zones:
+        z = copy(z)
+        z.climate = None
+        detached.append(z)
+    # End for
+
+    return detached
+# End _detach_climate()
+
+
+def _group_worker(conn, group: _ZoneGroup):
+    """Step a group of zones as instructed by the main process."""
+    while True:
+        msg = conn.recv()
+        try:
+            if msg is None:
+                conn.send((True, group.final_state()))
+                break
+            # End if
+
+            conn.send((True, group.step(*msg)))
+        except Exception as e:
+            conn.send((False, e))
+            break
+        # End try
+    # End while
+
+    conn.close()
+# End _group_worker()
+
+
+def _receive(conn):
+    ok, value = conn.recv()
+    if not ok:
+        raise value
+
+    return value
+# End _receive()
+
+
+# Climate data shared by zones run in a worker process, by `id()` in the main process
+_climates = {}
+
+
+def _init_worker(climates: Dict):
+    _climates.update(climates)
+# End _init_worker()
+
+
+def _run_zones(zones: List, climate_ids: List[int], managers: Dict, time_steps,
+               on_date: Dict, event_driven: bool) -> tuple:
+    """Run zones across the whole time horizon."""
+    results = {}
+    for z, c_id in zip(zones, climate_ids):
+        z.climate = _climates[c_id]
+        results[z.name] = z.run(managers[z.name], time_steps,
+                                event_driven=event_driven, on_date=on_date)
+    # End for
+
+    return results, _detach_climate(zones), managers
+# End _run_zones()
+
 
 class Catchment(object):
+
+    """A collection of farm zones, each with its own manager (by zone name)."""
+
     def __init__(self, zones, managers):
         self.zones = zones
         self.managers = managers
     # End __init__()
 
     def run_timestep(self, dt):
+        """Step all zones.
+
+        Returns
+        ---------
+        * Dict[str, Dict] : results by zone name, for zones where harvests occurred
+        """
+        results = {}
         for z in self.zones:
             farmer = self.managers[z.name]
-            z.run_timestep(farmer, dt)
+            res = z.run_timestep(farmer, dt)
+            if res is not None:
+                results[z.name] = res
         # End for
+
+        return results
     # End run_timestep()
-# End Catchment()
\ No newline at end of file
+
+    def run(self, time_steps=None, on_date: Optional[Dict] = None, cpus: int = 1,
+            coupling: Optional[ZoneCoupling] = None, chunksize: int = 1,
+            event_driven: bool = True) -> Dict[str, List[Dict]]:
+        """Run all zones across a sequence of time steps, optionally in parallel.
+
+        Without coupling, zones are independent and each is run across
+        the whole time horizon in a worker process (see `FarmZone.run()`).
+        With coupling, each worker process steps a group of zones one
+        day at a time, waiting for all other zones to complete the day
+        before state is exchanged (see `ZoneCoupling`).
+
+        On completion, zones and managers are replaced with their final
+        state as held by the worker processes.
+
+        Climate data is sent to each worker process once. Data placed in
+        shared memory (see `Climate.to_shared_memory()`) is not copied.
+
+        Parameters
+        ----------
+        * time_steps : DatetimeIndex, consecutive days to run.
+                       Defaults to all time steps in the climate data of the first zone.
+        * on_date : Dict[Tuple[int, int], Callable], functions to call with
+                    (zone, datetime) on a given (month, day), see `FarmZone.run()`.
+                    Functions must be defined at module level.
+        * cpus : int, number of worker processes. Zones are run in the
+                 current process if set to 1. Uses all CPUs if None.
+        * coupling : ZoneCoupling, exchange of state between zones after
+                     each time step
+        * chunksize : int, number of zones sent to a worker at a time
+                      (uncoupled runs only)
+        * event_driven : bool, see `FarmZone.run()` (uncoupled runs only,
+                         coupled runs step every day)
+
+        Returns
+        ---------
+        * Dict[str, List[Dict]] : results of each zone by name, in zone order
+        """
+        if time_steps is None:
+            time_steps = self.zones[0].climate.time_steps
+
+        on_date = {} if on_date is None else on_date
+        cpus = min(cpus or cpu_count(), len(self.zones))
+
+        if coupling is not None:
+            return self._run_coupled(time_steps, on_date, cpus, coupling)
+
+        if cpus <= 1:
+            return {z.name: z.run(self.managers[z.name], time_steps,
+                                  event_driven=event_driven, on_date=on_date)
+                    for z in self.zones}
+        # End if
+
+        climates = {id(z.climate): z.climate for z in self.zones}
+        chunks = [self.zones[i:i+chunksize] for i in range(0, len(self.zones), chunksize)]
+        with ProcessPool(max_workers=cpus, initializer=_init_worker,
+                         initargs=(climates, )) as pool:
+            futures = [pool.schedule(_run_zones,
+                                     args=(_detach_climate(chunk),
+                                           [id(z.climate) for z in chunk],
+                                           {z.name: self.managers[z.name] for z in chunk},
+                                           time_steps, on_date, event_driven))
+                       for chunk in chunks]
+            states = [f.result() for f in futures]
+        # End with
+
+        return self._gather(states)
+    # End run()
+
+    def _run_coupled(self, time_steps, on_date: Dict, cpus: int,
+                     coupling: ZoneCoupling) -> Dict[str, List[Dict]]:
+        """Step zones one day at a time, exchanging state between zones each day."""
+        days = time_steps.values.astype('datetime64[D]').astype(np.int64)
+        ordinals = (days + EPOCH_ORDINAL).tolist()
+        md_list = ((time_steps.month.values * 100) + time_steps.day.values).tolist()
+        on_md = {m * 100 + d for (m, d) in on_date}
+
+        groups = [[self.zones[i] for i in idx]
+                  for idx in np.array_split(np.arange(len(self.zones)), max(cpus, 1))]
+        groups = [_ZoneGroup(zones, {z.name: self.managers[z.name] for z in zones},
+                             coupling, on_date)
+                  for zones in groups]
+
+        processes = []
+        conns = []
+        if cpus > 1:
+            ctx = get_context()
+            for group in groups:
+                conn, child_conn = ctx.Pipe()
+                proc = ctx.Process(target=_group_worker, args=(child_conn, group), daemon=True)
+                proc.start()
+                child_conn.close()
+                processes.append(proc)
+                conns.append(conn)
+            # End for
+        # End if
+
+        updates = {}
+        try:
+            for k, t in enumerate(ordinals):
+                md = md_list[k]
+                timestamp = time_steps[k] if md in on_md else None
+                msgs = [(t, timestamp, md, {z.name: updates[z.name] for z in group.zones
+                                            if z.name in updates})
+                        for group in groups]
+
+                # All zones complete the time step before state is exchanged
+                states = {}
+                if conns:
+                    for conn, msg in zip(conns, msgs):
+                        conn.send(msg)
+                    for conn in conns:
+                        states.update(_receive(conn))
+                else:
+                    for group, msg in zip(groups, msgs):
+                        states.update(group.step(*msg))
+                # End if
+
+                updates = coupling.exchange(states, t)
+            # End for
+
+            if conns:
+                for conn in conns:
+                    conn.send(None)
+                final = [_receive(conn) for conn in conns]
+            else:
+                final = [group.final_state() for group in groups]
+            # End if
+        except Exception:
+            for proc in processes:
+                proc.terminate()
+            raise
+        # End try
+
+        for proc in processes:
+            proc.join()
+        # End for
+
+        return self._gather(final)
+    # End _run_coupled()
+
+    def _gather(self, states: List[tuple]) -> Dict[str, List[Dict]]:
+        """Collect results and final state of zones from groups of zones."""
+        results = {}
+        zones = {}
+        for res, g_zones, managers in states:
+            results.update(res)
+            self.managers.update(managers)
+            for z in g_zones:
+                zones[z.name] = z
+        # End for
+
+        for i, z in enumerate(self.zones):
+            final = zones[z.name]
+            final.climate = z.climate
+            self.zones[i] = final
+        # End for
+
+        return {z.name: results[z.name] for z in self.zones}
+    # End _gather()
+
+# End Catchment()
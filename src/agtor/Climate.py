@@ -1,35 +1,393 @@
+import weakref
+
 import numpy as np
 import pandas as pd
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8, climate data can be shared through memory-mapped files instead
+    shared_memory = None
+
 from .Component import Component
+from .data_interface import (read_climate_binary, write_climate_binary, 
+                             EPOCH_ORDINAL)
+
+
+class _cached_property(object):
+
+    """Property computed on first access and then held by the instance.
+
+    Stands in for `functools.cached_property`, which requires Python 3.8.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+    # End __init__()
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+
+        # Stored under the same name, so later lookups find the
+        # instance attribute without calling this descriptor
+        value = obj.__dict__[self.name] = self.func(obj)
+
+        return value
+    # End __get__()
+
+# End _cached_property()
+
+
+class ClimateHandle(object):
+
+    """Reference to climate data held in shared memory or a memory-mapped file.
+
+    Handles are small, and are what is sent to other processes in 
+    place of the climate data itself. See `Climate.attach()`.
+
+    Shared memory blocks hold climate values followed by the integer 
+    day ordinal of each row.
+    """
+
+    __slots__ = ('kind', 'location', 'shape', 'dtype', 'columns', 
+                 'index_name', 'mmap_mode')
+
+    def __init__(self, kind: str, location: str, shape: tuple, dtype: str, 
+                 columns: list, index_name, mmap_mode='r'):
+        """
+        Parameters
+        ----------
+        * kind : str, 'shared_memory' or 'file'
+        * location : str, name of the shared memory block, or path to climate data
+        * shape : tuple, shape of climate values
+        * dtype : str, numpy dtype of climate values
+        * columns : List[str], column names
+        * index_name : str, name of the date index, if any
+        * mmap_mode : str, memory-map mode for file data
+        """
+        self.kind = kind
+        self.location = location
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.columns = list(columns)
+        self.index_name = index_name
+        self.mmap_mode = mmap_mode
+    # End __init__()
+
+    @property
+    def ordinals_offset(self) -> int:
+        """Position of day ordinals in a shared memory block, in bytes."""
+        nbytes = int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+        # Aligned for int64 values
+        return -(-nbytes // 8) * 8
+    # End ordinals_offset()
+
+    def __getstate__(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+    # End __getstate__()
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+    # End __setstate__()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.kind!r}, {self.location!r}, shape={self.shape})"
+    # End __repr__()
+
+# End ClimateHandle()
+
+
+# Climate data attached to in this process, by handle location, 
+# so that each process maps shared data once
+_attached = weakref.WeakValueDictionary()
+
+
+def _attach_climate(handle: ClimateHandle, attributes: dict):
+    """Recreate a Climate sent to this process, reusing an existing attachment."""
+    key = (handle.kind, handle.location)
+    climate = _attached.get(key)
+    if climate is None:
+        climate = Climate.attach(handle)
+        _attached[key] = climate
+    # End if
+
+    climate._set_attributes(**attributes)
+
+    return climate
+# End _attach_climate()
 
 
 class Climate(Component):
 
     """Serves as an interface to climate data"""
 
-    def __init__(self, data, **kwargs):
+    def __init__(self, data, dtype=np.float64, **kwargs):
         """
         Parameters
         ----------
         * data: pd.DataFrame, climate data
+        * dtype : numpy dtype, storage type for climate values. 
+                  Use `np.float32` to halve memory use.
+
+        Additional keyword arguments supplied will be added as object 
+        attributes.
+        """
+        values = np.ascontiguousarray(data.to_numpy(dtype=dtype))
+        self._set_store(values, data.index, list(data.columns))
+        self._set_attributes(**kwargs)
+    # End init()
+
+    @classmethod
+    def from_mmap(cls, path: str, mmap_mode='r', **kwargs):
+        """Create Climate from data saved with `to_binary()` or `convert_climate_csv()`.
+
+        Climate values are memory-mapped rather than read in, so 
+        loading is near-instant and processes reading the same file 
+        share memory pages.
+
+        Parameters
+        ----------
+        * path : str, directory holding climate data
+        * mmap_mode : str, memory-map mode passed to `np.load()`. 
+                      Defaults to read-only.
 
         Additional keyword arguments supplied will be added as object 
         attributes.
         """
-        self._data = data
-        self.data = self._data.to_records()
+        values, ordinals, meta = read_climate_binary(path, mmap_mode=mmap_mode)
 
-        self.time_steps = self._data.index
+        time_steps = pd.DatetimeIndex((ordinals - EPOCH_ORDINAL).astype('datetime64[D]'),
+                                      name=meta['index_name'])
+
+        climate = cls.__new__(cls)
+        climate._set_store(values, time_steps, meta['columns'], ordinals=ordinals)
+        climate._set_attributes(**kwargs)
+
+        if isinstance(values, np.memmap):
+            climate._handle = ClimateHandle('file', path, values.shape, values.dtype.str, 
+                                            meta['columns'], meta['index_name'], 
+                                            mmap_mode=mmap_mode)
+        # End if
 
+        return climate
+    # End from_mmap()
+
+    def to_shared_memory(self):
+        """Copy climate data into a shared memory block, for use across processes.
+
+        The returned Climate is backed by the shared memory block. When 
+        sent to another process (e.g. as part of a zone given to a 
+        worker process), only a handle to the block is pickled. The 
+        receiving process attaches to the same memory and reads climate 
+        values without copying them. Values are read-only.
+
+        The block is freed with `release()` once it is no longer needed.
+        Requires Python 3.8 or above, otherwise see `to_binary()` and 
+        `from_mmap()`, which give the same behaviour through a file.
+
+        Returns
+        ---------
+        * Climate : backed by shared memory
+        """
+        if shared_memory is None:
+            raise NotImplementedError("Shared memory requires Python 3.8 or above. "
+                                      "Use `to_binary()` and `from_mmap()` instead.")
+
+        values = self.values
+        ordinals = self._ordinals
+        handle = ClimateHandle('shared_memory', None, values.shape, values.dtype.str, 
+                               self.columns, self.time_steps.name)
+        offset = handle.ordinals_offset
+
+        shm = shared_memory.SharedMemory(create=True, size=offset + ordinals.nbytes)
+        handle.location = shm.name
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        np.ndarray(ordinals.shape, dtype=np.int64, buffer=shm.buf, offset=offset)[:] = ordinals
+
+        climate = self._from_shared(handle, shm, owner=True)
+        climate._set_attributes(**{k: getattr(self, k) for k in self._attribute_names})
+        _attached[('shared_memory', shm.name)] = climate
+
+        return climate
+    # End to_shared_memory()
+
+    @classmethod
+    def attach(cls, handle: ClimateHandle):
+        """Create Climate from shared or memory-mapped data, without copying it.
+
+        Parameters
+        ----------
+        * handle : ClimateHandle, see `handle`
+        """
+        if handle.kind == 'file':
+            return cls.from_mmap(handle.location, mmap_mode=handle.mmap_mode)
+
+        if shared_memory is None:
+            raise NotImplementedError("Shared memory requires Python 3.8 or above")
+
+        return cls._from_shared(handle, shared_memory.SharedMemory(name=handle.location))
+    # End attach()
+
+    @classmethod
+    def _from_shared(cls, handle: ClimateHandle, shm, owner: bool = False):
+        values = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf)
+        values.flags.writeable = False
+        ordinals = np.ndarray((handle.shape[0], ), dtype=np.int64, buffer=shm.buf, 
+                              offset=handle.ordinals_offset)
+        ordinals.flags.writeable = False
+
+        time_steps = pd.DatetimeIndex((ordinals - EPOCH_ORDINAL).astype('datetime64[D]'),
+                                      name=handle.index_name)
+
+        climate = cls.__new__(cls)
+        climate._set_store(values, time_steps, handle.columns, ordinals=ordinals)
+        climate._set_attributes()
+        climate._handle = handle
+        climate._shm = shm
+        climate._owner = owner
+
+        return climate
+    # End _from_shared()
+
+    @property
+    def handle(self):
+        """Handle to shared or memory-mapped climate data (None if held in process memory)."""
+        return self._handle
+    # End handle()
+
+    def release(self):
+        """Detach from shared memory, freeing it if created by this Climate.
+
+        The Climate cannot be used afterwards. Has no effect for 
+        climate data not held in shared memory.
+        """
+        shm = self._shm
+        if shm is None:
+            return
+
+        _attached.pop((self._handle.kind, self._handle.location), None)
+
+        # Views onto the shared memory must be dropped before it is closed
+        self.values = None
+        self._ordinals = None
+        self._frame = None
+        self._shm = None
+        self._handle = None
+
+        shm.close()
+        if self._owner:
+            shm.unlink()
+    # End release()
+
+    def __getstate__(self):
+        """Climate data without derived lookup tables, views or statistics.
+
+        These are rebuilt when unpickled (see `__setstate__()`).
+        """
+        ordinals = self._ordinals
+
+        # Consecutive daily data is sent as its first day only
+        if len(ordinals) > 0 and (ordinals[-1] - ordinals[0]) == len(ordinals) - 1:
+            ordinals = int(ordinals[0])
+
+        return {
+            'values': np.asarray(self.values),
+            'ordinals': ordinals,
+            'columns': self.columns,
+            'index_name': self.time_steps.name,
+            'attributes': {k: getattr(self, k) for k in self._attribute_names}
+        }
+    # End __getstate__()
+
+    def __setstate__(self, state):
+        values = state['values']
+        ordinals = state['ordinals']
+        if isinstance(ordinals, int):
+            ordinals = np.arange(ordinals, ordinals + values.shape[0], dtype=np.int64)
+
+        time_steps = pd.DatetimeIndex((ordinals - EPOCH_ORDINAL).astype('datetime64[D]'),
+                                      name=state['index_name'])
+
+        self._set_store(values, time_steps, state['columns'], ordinals=ordinals)
+        self._set_attributes(**state['attributes'])
+    # End __setstate__()
+
+    def __reduce_ex__(self, protocol):
+        if self._handle is None:
+            return super().__reduce_ex__(protocol)
+
+        # Send a handle to shared data rather than the data itself
+        attributes = {k: getattr(self, k) for k in self._attribute_names}
+
+        return (_attach_climate, (self._handle, attributes))
+    # End __reduce_ex__()
+
+    def to_binary(self, path: str):
+        """Save climate data to a memory-mappable binary layout.
+
+        See `from_mmap()`.
+
+        Parameters
+        ----------
+        * path : str, directory to write to
+        """
+        write_climate_binary(path, self.values, self._ordinals, 
+                             self.columns, self.time_steps.name)
+    # End to_binary()
+
+    def _set_attributes(self, **kwargs):
         # Set all key word arguments as attributes
         for key, value in kwargs.items():
             setattr(self, key, value)
         # End For
 
-        climate_year = self._data.groupby(by=self._data.index.year).sum()
-        self.description = climate_year.describe()
-        self.description.loc['90%', :] = climate_year.quantile(q=0.9)
+        self._attribute_names = list(kwargs)
+    # End _set_attributes()
+
+    @_cached_property
+    def years(self) -> np.ndarray:
+        """Unique years covered by the climate data, in order."""
+        return np.unique(self._row_years)
+    # End years()
+
+    @_cached_property
+    def _row_years(self) -> np.ndarray:
+        """Year of each row in the climate data."""
+        dates = (self._ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+        return dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    # End _row_years()
+
+    @_cached_property
+    def annual_totals(self) -> np.ndarray:
+        """Yearly totals for each climate column, computed on first access.
+
+        Returns
+        --------
+        np.ndarray, of shape (years x columns), rows ordered as in `years`
+        """
+        row_years = self._row_years
+        starts = np.flatnonzero(np.r_[True, row_years[1:] != row_years[:-1]])
+
+        return np.add.reduceat(self.values, starts, axis=0, dtype=np.float64)
+    # End annual_totals()
+
+    @_cached_property
+    def _year_idx(self) -> dict:
+        return {y: i for i, y in enumerate(self.years.tolist())}
+    # End _year_idx()
+
+    @_cached_property
+    def description(self) -> pd.DataFrame:
+        """Summary statistics of yearly totals, including the 90th percentile."""
+        climate_year = pd.DataFrame(self.annual_totals, index=self.years, 
+                                    columns=self.columns)
+        description = climate_year.describe()
+        description.loc['90%', :] = climate_year.quantile(q=0.9)
 
         # self.min_rainfall = self.description.loc['min', 'rainfall']
         # self.max_rainfall = self.description.loc['max', 'rainfall']
@@ -37,14 +395,155 @@ class Climate(Component):
         # self.mean_rainfall = self.description.loc['mean', 'rainfall']
         # self.high_rainfall = self.description.loc['90%', 'rainfall']
 
-    # End init()
+        return description
+    # End description()
+
+    def _set_store(self, values: np.ndarray, time_steps, columns: list, ordinals=None):
+        """Set up the columnar climate store and lookup tables.
+
+        Parameters
+        ----------
+        * values : np.ndarray, 2D array of climate values (time x variable)
+        * time_steps : pd.DatetimeIndex, dates for each row
+        * columns : List[str], names of each column
+        * ordinals : np.ndarray, integer day ordinal of each row. 
+                     Derived from `time_steps` if not given.
+        """
+        assert values.ndim == 2 and values.shape == (len(time_steps), len(columns)), \
+            "Climate values must be a 2D array of shape (time steps, columns)"
+
+        self.values = values
+        self.time_steps = time_steps
+        self.columns = columns
+        self._col_idx = {c: j for j, c in enumerate(columns)}
+
+        # Map of field name to position of rainfall and ET columns
+        # Columns are expected to be named `{field}_rainfall` and `{field}_ET`
+        self._field_cols = {}
+        for c in columns:
+            if not c.endswith('_rainfall'):
+                continue
+
+            f_name = c[:-len('_rainfall')]
+            et_col = f'{f_name}_ET'
+            if et_col in self._col_idx:
+                self._field_cols[f_name] = (self._col_idx[c], self._col_idx[et_col])
+        # End for
+
+        # Map of integer day ordinals to row positions, so per-day lookups
+        # do not need to scan the time index
+        if ordinals is None:
+            dates = time_steps.values.astype('datetime64[D]')
+            ordinals = dates.astype(np.int64) + EPOCH_ORDINAL
+        # End if
+
+        self._ordinals = np.asarray(ordinals, dtype=np.int64)
+        self._time_idx = {t: i for i, t in enumerate(self._ordinals.tolist())}
+        assert np.all(np.diff(self._ordinals) > 0), \
+            "Climate data must be sorted by date with no duplicate dates"
+
+        # Prefix sums of climate columns, populated on first use
+        self._cumsums = {}
+        self._matched_cols = {}
+        self._frame = None
+
+        # Shared or memory-mapped data, see `to_shared_memory()` and `from_mmap()`
+        self._handle = None
+        self._shm = None
+        self._owner = False
+    # End _set_store()
+
+    @property
+    def _data(self):
+        """Climate data as a DataFrame sharing memory with the value store."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.values, index=self.time_steps, 
+                                       columns=self.columns, copy=False)
+        # End if
+
+        return self._frame
+    # End _data()
+
+    @property
+    def data(self):
+        return self._data
+    # End data()
 
     def __getattr__(self, attr):
-        return getattr(self.data, attr)
+        # Only reached for attributes not found on the object itself.
+        # Private attributes are never forwarded to avoid recursing 
+        # before the store is set up (e.g. when unpickling).
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+
+        return getattr(self._data, attr)
     # End __getattr__()
 
     def __getitem__(self, item):
-        return self.data[item]
+        if isinstance(item, str) and item in self._col_idx:
+            return self.values[:, self._col_idx[item]]
+        elif isinstance(item, (int, np.integer)):
+            return self.values[item]
+        # End if
+
+        return self._data[item]
+    # End __getitem__()
+
+    def column(self, name: str) -> np.ndarray:
+        """View of a single climate column (no copy is made)."""
+        return self.values[:, self._col_idx[name]]
+    # End column()
+
+    def field_columns(self, field_name: str) -> tuple:
+        """Column positions of rainfall and ET data for a field.
+
+        Returns
+        --------
+        tuple[int] : positions of rainfall and ET columns
+        """
+        try:
+            return self._field_cols[field_name]
+        except KeyError:
+            raise KeyError(f"No rainfall/ET columns found for {field_name}") from None
+    # End field_columns()
+
+    def time_index(self, dt) -> int:
+        """Get the row position of a date in the climate data.
+
+        Parameters
+        ----------
+        * dt : datetime or int, date or integer day ordinal to look up
+
+        Returns
+        --------
+        int, row position of the given date
+        """
+        key = dt if isinstance(dt, (int, np.integer)) else dt.toordinal()
+        try:
+            return self._time_idx[key]
+        except KeyError:
+            raise KeyError(f"{dt} not found in climate data") from None
+    # End time_index()
+
+    def get_rainfall_et(self, idx: int, field_name: str) -> tuple:
+        """Retrieve rainfall and ET for a field at a given row position.
+
+        Columns are expected to be named `{field_name}_rainfall` and 
+        `{field_name}_ET`.
+
+        Parameters
+        ----------
+        * idx : int, row position as given by `time_index()`
+        * field_name : str, name of field
+
+        Returns
+        --------
+        tuple[float] : rainfall and ET (in mm)
+        """
+        rain_col, et_col = self.field_columns(field_name)
+        row = self.values[idx]
+        return float(row[rain_col]), float(row[et_col])
+    # End get_rainfall_et()
 
     # def get_climate_stat(self, attrib, phenom='rainfall'):
     #     """Retrieve climate statistics.
@@ -69,21 +568,26 @@ class Climate(Component):
     #     return self.description.loc[attrib, phenom]
     # # End get_climate_stat()
 
-    def annual_rainfall(self, timestep):
+    def annual_rainfall(self, timestep, partial_name: str = ''):
         """
         Calculate the total amount of rainfall that occured in a year, given in the timestep
 
         Parameters
         ----------
         * timestep : datetime or int, indicating year in terms of time step.
+        * partial_name : str, field name or identifier of rainfall columns
+                         (see `get_seasonal_rainfall()`). Defaults to all 
+                         rainfall columns.
         """
-        year = timestep if type(timestep) == int else timestep.year
-        data = self.data
+        year = timestep if isinstance(timestep, (int, np.integer)) else timestep.year
+        try:
+            row = self._year_idx[year]
+        except KeyError:
+            raise KeyError(f"No climate data for year {year}") from None
 
-        year_data = data[data.index.year == year]
-        yearly_rainfall = year_data.sum()
+        cols = [self._col_idx[c] for c in self._match_columns('rainfall', partial_name)]
 
-        return yearly_rainfall['rainfall']
+        return self.annual_totals[row, cols].sum()
     # End annual_rainfall()
 
     def get_season_range(self, start, end):
@@ -94,10 +598,9 @@ class Climate(Component):
         * start : datetime, start of range in Y-m-d format, inclusive.
         * end : datetime, end of range in Y-m-d format, inclusive.
         """
-        data = self._data
-        mask = (data.index >= start) & (data.index <= end)
+        i, j = self._row_range(start, end)
 
-        return self.data[mask]
+        return self._data.iloc[i:j]
     # End get_season_range()
 
     def _ensure_datetime(self, start, end):
@@ -115,6 +618,101 @@ class Climate(Component):
         return start, end
     # End _ensure_datetime()
 
+    def _cumulative(self, col: str) -> np.ndarray:
+        """Cumulative sum of a column, with a leading zero.
+
+        Computed once per column, so that the total across any 
+        row range `[i, j)` is `cs[j] - cs[i]`.
+        """
+        try:
+            return self._cumsums[col]
+        except KeyError:
+            pass
+        # End try
+
+        cs = np.zeros(len(self._ordinals) + 1, dtype=np.float64)
+        np.cumsum(self.column(col), dtype=np.float64, out=cs[1:])
+        self._cumsums[col] = cs
+
+        return cs
+    # End _cumulative()
+
+    def _row_range(self, start, end) -> tuple:
+        """Row positions covering a date range, inclusive of both ends.
+
+        Returns
+        --------
+        tuple[int] : start and end (exclusive) row positions
+        """
+        start, end = [d if isinstance(d, (int, np.integer)) 
+                      else pd.to_datetime(d).toordinal()
+                      for d in (start, end)]
+
+        ordinals = self._ordinals
+        i = np.searchsorted(ordinals, start, side='left')
+        j = np.searchsorted(ordinals, end, side='right')
+
+        return i, j
+    # End _row_range()
+
+    def range_sum(self, start, end, columns) -> float:
+        """Total of climate columns across a date range.
+
+        Totals are taken from precomputed prefix sums so the cost does 
+        not depend on the length of the range or climate record.
+
+        Parameters
+        ----------
+        * start : datetime or int, start of range (or day ordinal), inclusive.
+        * end : datetime or int, end of range (or day ordinal), inclusive.
+        * columns : str or List[str], name(s) of columns to total
+
+        Returns
+        --------
+        float, sum of values across all given columns
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+
+        i, j = self._row_range(start, end)
+        if j <= i:
+            return 0.0
+
+        total = 0.0
+        for col in columns:
+            cs = self._cumulative(col)
+            total += cs[j] - cs[i]
+        # End for
+
+        return total
+    # End range_sum()
+
+    def _match_columns(self, phenom: str, name: str) -> list:
+        """Names of the columns holding a phenomenon for a field or identifier.
+
+        Field names are resolved exactly (see `field_columns()`), so that 
+        e.g. 'field1' does not match columns of 'field10'. Otherwise all
+        columns containing both the phenomenon and identifier are used.
+        """
+        key = (phenom, name)
+        try:
+            return self._matched_cols[key]
+        except KeyError:
+            pass
+        # End try
+
+        if name in self._field_cols:
+            rain_col, et_col = self._field_cols[name]
+            cols = [self.columns[rain_col if phenom == 'rainfall' else et_col]]
+        else:
+            cols = [c for c in self.columns if (phenom in c) and (name in c)]
+        # End if
+
+        self._matched_cols[key] = cols
+
+        return cols
+    # End _match_columns()
+
     def get_seasonal_rainfall(self, season_range, partial_name: str):
         """Retrieve seasonal rainfall by matching column name. 
         Columns names are expected to have 'rainfall' with some identifier.
@@ -122,7 +720,9 @@ class Climate(Component):
         Parameters
         ----------
         * season_range : List-like, start and end dates, can be string or datetime object
-        * partial_name : str, string to (partially) match column name identifier on
+        * partial_name : str, field name, or string to (partially) match column 
+                         names on. Field names are matched exactly, see 
+                         `field_columns()`. Otherwise all matching columns are totalled.
 
         Example
         ----------
@@ -135,29 +735,27 @@ class Climate(Component):
         numeric, representing seasonal rainfall
         """
         start, end = self._ensure_datetime(*season_range)
-        rain_cols = [c for c in self.data.dtype.names if ('rainfall' in c) and (partial_name in c)]
 
-        subset = self.get_season_range(start, end)[rain_cols]
-        total = subset.astype('float64').sum()
-        return total
+        return self.range_sum(start, end, self._match_columns('rainfall', partial_name))
     # End get_seasonal_rainfall()
 
     def get_seasonal_et(self, season_range, partial_name: str):
-        """Retrieve seasonal rainfall.
+        """Retrieve seasonal evapotranspiration by matching column name.
 
         Parameters
         ----------
         * season_range : List-like, start and end dates, can be string or datetime object
-        * partial_name : str, string to (partially) match column name identifier on
+        * partial_name : str, field name, or string to (partially) match column 
+                         names on. Field names are matched exactly, see 
+                         `field_columns()`. Otherwise all matching columns are totalled.
 
         Returns
         --------
-        numeric of seasonal rainfall
+        numeric of seasonal ET
         """
         start, end = self._ensure_datetime(*season_range)
-        et_cols = [c for c in self.data.columns if ('ET' in c) and (partial_name in c)]
 
-        return self.get_season_range(start, end).loc[:, et_cols].sum()[0]
+        return self.range_sum(start, end, self._match_columns('ET', partial_name))
     # End get_seasonal_et()
 
 # End Climate()
@@ -1,17 +1,228 @@
 from typing import Dict
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 from agtor.data_interface import generate_params
 from ema_workbench import (CategoricalParameter, Constant, RealParameter)
 
+
+
+class RegisteredParameter(object):
+
+    """A parameter whose value is held in a `ParameterRegistry`.
+
+    Components holding registered parameters read their current value
+    from the registry's value vector.
+    """
+
+    __slots__ = ('registry', 'slot', 'definition')
+
+    def __init__(self, registry, slot: int, definition):
+        """
+        Parameters
+        ----------
+        * registry : ParameterRegistry, holding the parameter value
+        * slot : int, position of the parameter value in the registry
+        * definition : EMA Workbench parameter the value is for
+        """
+        self.registry = registry
+        self.slot = slot
+        self.definition = definition
+    # End __init__()
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+    # End name()
+
+    @property
+    def value(self) -> float:
+        return self.registry.values.item(self.slot)
+    # End value()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name!r}, slot={self.slot})"
+    # End __repr__()
+
+# End RegisteredParameter()
+
+
+PARAM_TYPES = (CategoricalParameter, Constant, RealParameter, RegisteredParameter)
+
+
+def _nominal(item):
+    """Nominal value of a parameter, or the item itself if not a parameter."""
+    if isinstance(item, PARAM_TYPES):
+        try:
+            return item.value
+        except AttributeError:
+            return item.default
+        # End try
+    # End if
+
+    return item
+# End _nominal()
+
+
+def _resolve(item):
+    """Resolve parameters to nominal values, freezing any nested components."""
+    if isinstance(item, PARAM_TYPES):
+        return _nominal(item)
+    elif isinstance(item, Component):
+        return item.freeze()
+    elif isinstance(item, dict):
+        resolved = {k: _resolve(v) for k, v in item.items()}
+        if any(resolved[k] is not v for k, v in item.items()):
+            return resolved
+    elif isinstance(item, (list, tuple)):
+        resolved = [_resolve(v) for v in item]
+        if any(a is not b for a, b in zip(resolved, item)):
+            return type(item)(resolved)
+    # End if
+
+    return item
+# End _resolve()
+
+
+def _has_params(item) -> bool:
+    if isinstance(item, PARAM_TYPES):
+        return True
+    elif isinstance(item, dict):
+        return any(_has_params(v) for v in item.values())
+    # End if
+
+    return False
+# End _has_params()
+
+
+def _attributes(obj) -> Dict:
+    """Attributes held by an object (in slots or `__dict__`), as stored."""
+    attrs = dict(object.__getattribute__(obj, '__dict__')) if hasattr(obj, '__dict__') else {}
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            try:
+                attrs[name] = object.__getattribute__(obj, name)
+            except AttributeError:
+                # Slot not set
+                pass
+        # End for
+    # End for
+
+    return attrs
+# End _attributes()
+
+
+def slotted(*extra, exclude=()):
+    """Class decorator giving a dataclass `__slots__` for its fields.
+
+    Applied above `@dataclass`. Instances no longer hold a `__dict__`, 
+    so other attributes set on instances have to be listed in `extra`.
+
+    Parameters
+    ----------
+    * extra : str, names of non-field instance attributes
+    * exclude : tuple[str], fields not to hold in slots, 
+                e.g. those managed by a descriptor
+    """
+    def wrap(cls):
+        inherited = set()
+        for base in cls.__mro__[1:]:
+            inherited.update(base.__dict__.get('__slots__', ()))
+        # End for
+
+        names = [f.name for f in fields(cls) if f.name not in exclude] + list(extra)
+        slots = tuple(n for n in dict.fromkeys(names) if n not in inherited)
+
+        # Field defaults are held by the generated `__init__()`, so
+        # class attributes can be replaced by slots
+        cls_dict = dict(cls.__dict__)
+        for name in slots + ('__dict__', '__weakref__'):
+            cls_dict.pop(name, None)
+        # End for
+        cls_dict['__slots__'] = slots
+
+        return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    # End wrap()
+
+    return wrap
+# End slotted()
+
+
+class Versioned(object):
+
+    """Mixin for components whose attribute values are cached elsewhere.
+
+    Setting an attribute increments the component's own `_version`, so
+    that values derived from it (e.g. costs cached by a `Manager`) can be
+    checked for changes component by component. Slotted subclasses 
+    list `_version` among their slots (see `slotted()`).
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        self._touch()
+    # End __setattr__()
+
+    def _touch(self):
+        """Record a change not made by setting an attribute, e.g. through a `ParameterRegistry`."""
+        try:
+            version = object.__getattribute__(self, '_version')
+        except AttributeError:
+            version = 0
+        # End try
+
+        object.__setattr__(self, '_version', version + 1)
+    # End _touch()
+
+# End Versioned()
+
+
+_frozen_classes = {}
+
+
+def _frozen_class(cls):
+    """Subclass of a component class using ordinary attribute access."""
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        frozen = type(f"Frozen{cls.__name__}", (cls,), {
+            '__getattribute__': object.__getattribute__,
+            '__module__': cls.__module__,
+            '__slots__': (),
+            '_frozen': True
+        })
+        _frozen_classes[cls] = frozen
+    # End if
+
+    return frozen
+# End _frozen_class()
+
+
+def _restore_frozen(cls, state: Dict):
+    """Recreate a frozen component, e.g. when unpickling."""
+    obj = cls.__new__(cls)
+    for attr, v in state.items():
+        object.__setattr__(obj, attr, v)
+    # End for
+    obj.__class__ = _frozen_class(cls)
+
+    return obj
+# End _restore_frozen()
+
+
 @dataclass
 class Component:
 
     """Base Agtor component"""
 
+    __slots__ = ('_params', )
+
+    # Frozen components hold plain values instead of parameters, see `freeze()`
+    _frozen = False
+
     def __getattribute__(self, attr):
         v = object.__getattribute__(self, attr)
-        if isinstance(v, (CategoricalParameter, Constant, RealParameter)):
+        if isinstance(v, PARAM_TYPES):
             try:
                 val = v.value
             except AttributeError:
@@ -24,17 +235,66 @@ class Component:
     # End __getattribute__()
 
     def get_nominal(self, item):
-        if isinstance(item, (CategoricalParameter, Constant, RealParameter)):
-            try:
-                val = item.value
-            except AttributeError:
-                val = item.default
-            # End try
+        return _nominal(item)
+    # End get_nominal()
 
-            return val
+    def refresh(self):
+        """Recalculate attributes derived from parameter values.
 
-        return item
-    # End get_nominal()
+        Called when parameter values change after creation, see `ParameterRegistry.load()`.
+        """
+        pass
+    # End refresh()
+
+    def freeze(self):
+        """Resolve parameters to their nominal values ahead of simulation.
+
+        Parameters (including those nested in dicts, e.g. growth stages)
+        are replaced with plain values and nested components are frozen 
+        in turn. The component then uses ordinary attribute access, 
+        without checking for parameters on every lookup. 
+
+        Parameter objects remain available through `params`.
+        Freezing an already frozen component has no effect.
+
+        Returns
+        ---------
+        * the frozen component
+        """
+        if self._frozen:
+            return self
+
+        params = {}
+        for attr, v in _attributes(self).items():
+            if _has_params(v):
+                params[attr] = v
+            
+            resolved = _resolve(v)
+            if resolved is not v:
+                object.__setattr__(self, attr, resolved)
+        # End for
+
+        self._params = params
+        self.__class__ = _frozen_class(type(self))
+
+        return self
+    # End freeze()
+
+    @property
+    def params(self) -> Dict:
+        """Parameter objects of the component, by attribute name."""
+        if self._frozen:
+            return self._params
+
+        return {attr: v for attr, v in _attributes(self).items() if _has_params(v)}
+    # End params()
+
+    def __reduce_ex__(self, protocol):
+        if not self._frozen:
+            return super().__reduce_ex__(protocol)
+
+        return (_restore_frozen, (type(self).__bases__[0], _attributes(self)))
+    # End __reduce_ex__()
 
     @classmethod
     def load_data(cls, name, data, override=None):
@@ -1,13 +1,17 @@
 from typing import Optional, Dict
 from dataclasses import dataclass
+from datetime import date
 
 from agtor.data_interface import load_yaml, generate_params, sort_param_types
-from .Component import Component
+from .Component import Component, Versioned, slotted
 
+import numpy as np
 import pandas as pd
 
+@slotted('_stage_names', '_stage_table', '_initial_stage', '_sow_ordinal', 
+         'plant_month_day', 'harvest_days', 'harvest_offset', '_version')
 @dataclass
-class Crop(Component):
+class Crop(Versioned, Component):
     """Represents a crop type."""
 
     name: str
@@ -32,74 +36,111 @@ class Crop(Component):
 
     def __post_init__(self):
         sow_date = self.plant_date
-        self.plant_date = pd.to_datetime('1900-'+sow_date)
+        if isinstance(sow_date, str):
+            sow_date = pd.to_datetime('1900-'+sow_date)
 
+        self.plant_date = sow_date
+        self.plant_month_day = (self.plant_date.month, self.plant_date.day)
+        self._sow_ordinal = self.plant_date.toordinal()
+        self._stage_table = None
+
+        self.refresh()
+    # End __post_init__()
+
+    def refresh(self):
+        """Recalculate season length and growth stage table from growth stage values."""
         if self.growth_stages:
             h_day = sum(self.get_nominal(v['stage_length'])
                         for k, v in self.growth_stages.items())
-        
-        offset = 0
-        start_date = self.plant_date
-        self._stages = {}
-        if self.growth_stages:
-            for k, v in self.growth_stages.items():
+            self.harvest_offset = pd.DateOffset(days=h_day)
 
-                offset = self.get_nominal(v['stage_length'])
-                end_of_stage = start_date + pd.DateOffset(days=offset)
-                self._stages[k] = {
-                    'start': start_date,
-                    'end': end_of_stage
-                }
+            # Days from sowing to harvest
+            self.harvest_days = int(h_day)
 
-                start_date = start_date + pd.DateOffset(days=offset+1)
-            # End for
+            self._stage_names = list(self.growth_stages)
+            self._initial_stage = self._stage_names.index('initial') \
+                if 'initial' in self.growth_stages else 0
+            self._update_stage_table()
+        # End if
+    # End refresh()
 
-            self.harvest_offset = pd.DateOffset(days=h_day)
-    # End __post_init__()
+    def _update_stage_table(self):
+        """Tabulate growth stage and coefficients by day since sowing.
+
+        Each stage begins on the day after the previous stage ends, 
+        and ends `stage_length` days after it begins. The last entry 
+        holds the initial stage, used for days that are not in season.
+        The table is only rebuilt if stage values have changed.
+        """
+        stages = self.growth_stages.values()
+        lengths = tuple(int(self.get_nominal(v['stage_length'])) for v in stages)
+        depl_frac = tuple(self.get_nominal(v.get('depletion_fraction', np.nan)) for v in stages)
+        crop_coef = tuple(self.get_nominal(v.get('crop_coefficient', np.nan)) for v in stages)
+
+        key = (lengths, depl_frac, crop_coef)
+        if (self._stage_table is not None) and (self._stage_table[0] == key):
+            return
+
+        stage_ids = np.repeat(np.arange(len(lengths)), np.array(lengths) + 1)
+        stage_ids = np.append(stage_ids, self._initial_stage)
+        self._stage_table = (key, stage_ids, 
+                             np.array(depl_frac, dtype=np.float64)[stage_ids], 
+                             np.array(crop_coef, dtype=np.float64)[stage_ids])
+    # End _update_stage_table()
 
     def update_stages(self, dt):
-        stages = self._stages
-        start_date = self.plant_date.replace(year=dt.year)
+        """Set growth stages for a season sown on the given date.
+
+        Parameters
+        ----------
+        * dt : datetime or int, date or integer day ordinal of sowing
+        """
+        year = date.fromordinal(dt).year if isinstance(dt, (int, np.integer)) else dt.year
+        self._sow_ordinal = date(year, *self.plant_month_day).toordinal()
 
         if self.growth_stages:
-            for k, v in self.growth_stages.items():
-                offset = self.get_nominal(v['stage_length'])
-                end_of_stage = start_date + pd.DateOffset(days=offset)
+            self._update_stage_table()
+    # End update_stages()
+
+    def _stage_offset(self, dt) -> int:
+        """Position of a date in the stage table (-1 if out of season)."""
+        if dt is None:
+            return -1
 
-                stages[k] = {
-                    'start': start_date,
-                    'end': end_of_stage
-                }
+        ordinal = dt if isinstance(dt, (int, np.integer)) else dt.toordinal()
+        offset = ordinal - self._sow_ordinal
+        if (offset < 0) or (offset >= len(self._stage_table[1]) - 1):
+            return -1
 
-                start_date = start_date + pd.DateOffset(days=offset+1)
-            # End for
-    # End update_stages()
+        return offset
+    # End _stage_offset()
+
+    def get_stage(self, dt) -> int:
+        """Position of the growth stage for a date in `growth_stages`.
+
+        The initial growth stage is given if not in season.
+
+        Parameters
+        ----------
+        * dt : datetime or int, date or integer day ordinal
+        """
+        return self._stage_table[1].item(self._stage_offset(dt))
+    # End get_stage()
 
     def get_stage_coefs(self, dt):
-        if dt is None:
-            return self.growth_stages['initial']
-
-        for k, v in self._stages.items():
-            s, e = v['start'], v['end']
-            in_season = False
-            same_month = s.month == dt.month
-            if same_month:
-                in_day = s.day >= dt.day
-                in_season = same_month and in_day
-            elif (s.month <= dt.month):
-                if (dt.month <= e.month):
-                    in_season = dt.day <= e.day
-                # End if
-            # End if
-
-            if in_season:
-                return self.growth_stages[k]
-        # End for
-
-        # Not in season so just return initial growth stage
-        return self.growth_stages['initial']
+        return self.growth_stages[self._stage_names[self.get_stage(dt)]]
     # End get_stage_coefs()
 
+    def depletion_fraction(self, dt) -> float:
+        """Depletion fraction for the growth stage of a date."""
+        return self._stage_table[2].item(self._stage_offset(dt))
+    # End depletion_fraction()
+
+    def crop_coefficient(self, dt) -> float:
+        """Crop coefficient for the growth stage of a date (NaN if not given)."""
+        return self._stage_table[3].item(self._stage_offset(dt))
+    # End crop_coefficient()
+
     def estimate_income_per_ha(self):
         """Naive estimation of net income."""
         income = (self.price_per_yield * self.yield_per_ha) \
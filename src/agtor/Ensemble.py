@@ -0,0 +1,186 @@
+"""Run the model for each row of a sample matrix across a pool of processes.
+
+Sample matrices (e.g. from `data_interface.get_samples()`) hold a column
+for each parameter, named by parameter id as generated when components
+are created (e.g. `Crop___irrigated_wheat__properties__yield_per_ha`).
+Each row is given to a zone-building function as the `override` of
+component values, and the resulting zone is run with a fresh `Manager`.
+Alternatively, the zone is compiled once in each worker and zones are
+built directly from sample rows (see `ZoneTemplate`).
+"""
+from typing import Callable, Dict, List, Optional, Union
+from copy import deepcopy
+from multiprocessing import cpu_count
+
+import pandas as pd
+from pebble import ProcessPool
+
+from .Manager import Manager
+from .Template import ZoneTemplate
+from .data_interface import load_yaml, SpecBundle
+
+
+# Data shared by all runs in a worker process, see `_init_worker()`
+_worker_state = {}
+
+
+def load_specs(spec_dirs: Union[Dict[str, str], str], ext: str = '.yml',
+               cache_dir: Optional[str] = None) -> Dict[str, Dict]:
+    """Load component specifications from each directory, or from a scenario bundle.
+
+    Parameters
+    ----------
+    * spec_dirs : Dict[str, str], directory of specifications for each
+                  component type, e.g. `{'crops': 'data/crops/'}`.
+                  Alternatively, the path to a scenario bundle
+                  (see `data_interface.write_bundle()`).
+    * ext : str, file extension of specification files
+    * cache_dir : str, directory to cache parsed specifications in (see `load_yaml()`)
+
+    Returns
+    ---------
+    * Dict[str, Dict] : specifications by component type, then by name
+    """
+    if isinstance(spec_dirs, str):
+        with SpecBundle(spec_dirs) as bundle:
+            return bundle.select()
+    # End if
+
+    return {k: load_yaml(d, ext=ext, cache_dir=cache_dir) for k, d in spec_dirs.items()}
+# End load_specs()
+
+
+def _init_worker(build_zone: Callable, specs: Dict, climate, run_opts: Dict):
+    """Hold data shared by all runs so it is sent once per worker rather than with each task."""
+    _worker_state.update(build_zone=build_zone, specs=specs,
+                         climate=climate, run_opts=run_opts)
+
+    columns = run_opts.get('template')
+    if columns is not None:
+        _worker_state['template'] = ZoneTemplate.from_specs(build_zone, specs, climate, columns)
+# End _init_worker()
+
+
+def _run_sample(override) -> List[Dict]:
+    """Build and run a zone for a single sample, given as a dict or as a row for a template."""
+    state = _worker_state
+    run_opts = state['run_opts']
+
+    template = state.get('template')
+    if template is not None:
+        zone = template.build(override)
+    else:
+        # Specifications are copied as creating components replaces
+        # values in them with parameter objects
+        specs = deepcopy(state['specs'])
+        zone = state['build_zone'](specs, state['climate'], dict(override))
+    # End if
+
+    farmer = Manager(**run_opts['manager_opts'])
+
+    return zone.run(farmer, run_opts['time_steps'], on_date=run_opts['on_date'])
+# End _run_sample()
+
+
+def _run_chunk(rows: List[Dict]) -> List[List[Dict]]:
+    return [_run_sample(row) for row in rows]
+# End _run_chunk()
+
+
+def run_ensemble(build_zone: Callable, spec_dirs: Union[Dict[str, str], str], climate,
+                 samples: pd.DataFrame, time_steps=None, on_date: Optional[Dict] = None,
+                 manager_opts: Optional[Dict] = None, cpus: Optional[int] = None,
+                 chunksize: int = 1, timeout: Optional[float] = None,
+                 cache_dir: Optional[str] = None, template: bool = False) -> List:
+    """Run the model for each sample, distributing runs across processes.
+
+    Results are returned in sample order, regardless of the order in
+    which runs complete.
+
+    Parameters
+    ----------
+    * build_zone : Callable, function taking (specs, climate, override)
+                   and returning a `FarmZone`. Must be defined at module
+                   level so it can be sent to worker processes.
+    * spec_dirs : Dict[str, str], directories of component specifications
+                  by component type, or a scenario bundle (see `load_specs()`)
+    * climate : Climate, climate data for all runs. Data placed in shared memory
+                (see `Climate.to_shared_memory()`) or loaded with `Climate.from_mmap()`
+                is not copied to each worker.
+    * samples : DataFrame, parameter values for each run, with columns
+                named by parameter id
+    * time_steps : DatetimeIndex, days to run. Defaults to all time steps
+                   in the climate data.
+    * on_date : Dict[Tuple[int, int], Callable], see `FarmZone.run()`.
+                Functions must be defined at module level.
+    * manager_opts : Dict, arguments used to create the `Manager` for each run
+    * cpus : int, number of worker processes. Defaults to the number of CPUs.
+             Runs are made in the current process if set to 1.
+    * chunksize : int, number of runs sent to a worker at a time
+    * timeout : float, seconds each task (a chunk of runs) is allowed before
+                it is stopped. Not applied to runs in the current process.
+    * cache_dir : str, directory to cache parsed specifications in, so
+                  repeated ensembles do not parse them again (see `load_yaml()`)
+    * template : bool, compile the zone once per worker and build zones for
+                 each sample from it (see `ZoneTemplate`). Only suitable where
+                 the structure of zones created by `build_zone` does not
+                 depend on sample values.
+
+    Returns
+    ---------
+    * List : results of `FarmZone.run()` for each sample. Where a run failed
+             or timed out the raised exception is given instead.
+    """
+    if chunksize < 1:
+        raise ValueError(f"Chunk size must be at least 1. Got: {chunksize}")
+
+    if not cpus:
+        cpus = cpu_count()
+
+    specs = load_specs(spec_dirs, cache_dir=cache_dir)
+    run_opts = {
+        'time_steps': time_steps,
+        'on_date': on_date,
+        'manager_opts': manager_opts if manager_opts is not None else {},
+        'template': list(samples.columns) if template else None
+    }
+
+    if template:
+        rows = samples.to_numpy(dtype=object).tolist()
+    else:
+        rows = samples.to_dict(orient='records')
+
+    if cpus == 1:
+        _init_worker(build_zone, specs, climate, run_opts)
+        results = []
+        for row in rows:
+            try:
+                results.append(_run_sample(row))
+            except Exception as e:
+                results.append(e)
+        # End for
+
+        _worker_state.clear()
+
+        return results
+    # End if
+
+    chunks = [rows[i:i+chunksize] for i in range(0, len(rows), chunksize)]
+    with ProcessPool(max_workers=cpus, initializer=_init_worker,
+                     initargs=(build_zone, specs, climate, run_opts)) as pool:
+        futures = [pool.schedule(_run_chunk, args=(chunk, ), timeout=timeout)
+                   for chunk in chunks]
+
+        results = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                results += future.result()
+            except Exception as e:
+                # All runs in the chunk are lost, e.g. on TimeoutError
+                results += [e] * len(chunk)
+            # End try
+        # End for
+    # End with
+
+    return results
+# End run_ensemble()
@@ -1,16 +1,264 @@
 from typing import List, Optional, Iterable
 from dataclasses import dataclass, field
-import itertools as it
 
-from agtor.Component import Component
+from agtor.Component import Component, PARAM_TYPES, slotted
 from agtor.FieldComponent import Infrastructure
 from agtor.Crop import Crop
 from agtor.Irrigation import Irrigation
 
 from agtor.consts import ML_to_mm
 
+import numpy as np
 import pandas as pd
 
+
+class FieldState(object):
+
+    """Holds the state of a collection of fields in contiguous arrays.
+
+    Each row of `values` is a state attribute (see `attributes`) and each 
+    column a field, so that state can be updated for all fields at once.
+    Unset values are represented as NaN.
+    """
+
+    attributes = ('total_area_ha', 'soil_TAW', 'soil_SWD', 'irrigated_area')
+
+    __slots__ = ('values', )
+
+    def __init__(self, num_fields: int):
+        self.values = np.full((len(self.attributes), num_fields), np.nan)
+    # End __init__()
+
+    @classmethod
+    def from_fields(cls, fields: List):
+        """Gather state of given fields into a single FieldState.
+
+        Fields are bound to the created state, becoming views onto its columns.
+        """
+        state = cls(len(fields))
+        for i, f in enumerate(fields):
+            state.values[:, i] = f._state.values[:, f._idx]
+            f._state = state
+            f._idx = i
+        # End for
+
+        return state
+    # End from_fields()
+
+    @classmethod
+    def stack(cls, states: List['FieldState']) -> 'FieldState':
+        """Gather states of the same fields into a single FieldState.
+
+        Values gain a leading dimension, one entry for each given state
+        (e.g. for each parameter sample). Given states become views onto 
+        the stacked state.
+        """
+        stacked = cls.__new__(cls)
+        stacked.values = np.stack([s.values for s in states])
+        for s, values in zip(states, stacked.values):
+            s.values = values
+        # End for
+
+        return stacked
+    # End stack()
+
+# End FieldState()
+
+
+# Each state attribute is available as a view onto its row of values
+for _row, _attr in enumerate(FieldState.attributes):
+    setattr(FieldState, _attr, property(lambda self, _row=_row: self.values[..., _row, :]))
+
+
+class FieldParams(object):
+
+    """Crop and irrigation attributes of a collection of fields, held in arrays.
+
+    Gathered once and reused until a crop or irrigation system of the
+    fields is replaced or changed (see `is_current()`).
+    """
+
+    __slots__ = ('components', 'versions', 'e_rootzone', 'efficiency', 
+                 'depletion', 'crop_sow', 'season_days')
+
+    def __init__(self, fields: List):
+        """
+        Parameters
+        ----------
+        * fields : List[CropField], fields to gather attributes of
+        """
+        num_fields = len(fields)
+        self.e_rootzone = np.empty(num_fields)
+        self.efficiency = np.empty(num_fields)
+        self.crop_sow = np.empty(num_fields, dtype=np.int64)
+        self.season_days = np.empty(num_fields, dtype=np.int64)
+
+        # Depletion fraction by day since sowing, see `Crop._update_stage_table()`
+        tables = []
+        for i, f in enumerate(fields):
+            crop = f.crop
+            depl = crop._stage_table[2]
+            self.e_rootzone[i] = crop.root_depth_m * crop.effective_root_zone
+            self.efficiency[i] = f.irrigation.efficiency
+            self.crop_sow[i] = crop._sow_ordinal
+            self.season_days[i] = len(depl) - 1
+            tables.append(depl)
+        # End for
+
+        self.depletion = _pad_tables(tables)
+
+        self.components = self._components(fields)
+        self.versions = [c._version for c in self.components]
+    # End __init__()
+
+    @classmethod
+    def stack(cls, params: List['FieldParams']) -> 'FieldParams':
+        """Gather attributes of the same fields, with a leading dimension for each given entry."""
+        stacked = cls.__new__(cls)
+        for attr in ('e_rootzone', 'efficiency', 'crop_sow', 'season_days'):
+            setattr(stacked, attr, np.stack([getattr(p, attr) for p in params]))
+        # End for
+
+        stacked.depletion = _pad_tables([p.depletion for p in params])
+        stacked.components = None
+        stacked.versions = None
+
+        return stacked
+    # End stack()
+
+    @staticmethod
+    def _components(fields: List) -> list:
+        """Crop and irrigation system of each field."""
+        return [f.crop for f in fields] + [f.irrigation for f in fields]
+    # End _components()
+
+    def is_current(self, fields: List) -> bool:
+        """Whether attributes are up to date for the given fields (see `Versioned`)."""
+        components = self._components(fields)
+
+        return (self.versions == [c._version for c in components]) \
+            and all(a is b for a, b in zip(self.components, components))
+    # End is_current()
+
+# End FieldParams()
+
+
+def _pad_tables(tables: List[np.ndarray]) -> np.ndarray:
+    """Stack arrays differing in length along their last axis, padding with zeros."""
+    length = max(t.shape[-1] for t in tables)
+    padded = np.zeros((len(tables), ) + tables[0].shape[:-1] + (length, ))
+    for i, t in enumerate(tables):
+        padded[i, ..., :t.shape[-1]] = t
+    # End for
+
+    return padded
+# End _pad_tables()
+
+
+def update_SWD(state: FieldState, rainfall: np.ndarray, ET: np.ndarray):
+    """Update soil water deficit of all fields in a FieldState.
+
+    Parameters
+    ----------
+    * state : FieldState, optionally stacked (see `FieldState.stack()`)
+    * rainfall : np.ndarray, rainfall across timestep for each field in mm
+    * ET : np.ndarray, evapotranspiration across timestep for each field in mm
+    """
+    soil_SWD = state.soil_SWD
+    tmp = soil_SWD - (rainfall - ET)
+    np.minimum(tmp, state.soil_TAW, out=tmp)
+    np.maximum(tmp, 0.0, out=tmp)
+    np.round(tmp, 4, out=soil_SWD)
+# End update_SWD()
+
+
+def required_water(state: FieldState, params: FieldParams, t: Optional[int] = None) -> np.ndarray:
+    """Water needed to maintain moisture at net irrigation depth, for all fields in a FieldState.
+
+    Vectorized equivalent of `CropField.calc_required_water()`.
+    Factors in irrigation efficiency. Values are given in mm.
+
+    Parameters
+    ----------
+    * state : FieldState, optionally stacked (see `FieldState.stack()`)
+    * params : FieldParams, for the same fields, stacked alike
+    * t : int, integer day ordinal. Treated as out of season if None.
+
+    Returns
+    ---------
+    * np.ndarray : required water for each field
+    """
+    # Days out of season take the last entry of each table
+    season_days = params.season_days
+    pos = season_days
+    if t is not None:
+        offset = t - params.crop_sow
+        pos = np.where((offset >= 0) & (offset < season_days), offset, season_days)
+    depl_frac = np.take_along_axis(params.depletion, pos[..., None], axis=-1)[..., 0]
+
+    soil_SWD = state.soil_SWD
+
+    # Net irrigation depth
+    nid = params.e_rootzone * (state.soil_TAW * depl_frac)
+
+    req = np.round(soil_SWD / params.efficiency, 4)
+    req[(soil_SWD - nid) < 0.0] = 0.0
+
+    return req
+# End required_water()
+
+
+class _FieldStateAttr(object):
+
+    """Exposes a field's entry in a FieldState as an ordinary attribute."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.row = FieldState.attributes.index(name)
+    # End __init__()
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+
+        val = obj._state.values.item(self.row, obj._idx)
+
+        # NaN represents an unset value
+        return None if val != val else val
+    # End __get__()
+
+    def __set__(self, obj, value):
+        try:
+            state = obj._state
+        except AttributeError:
+            # Field is not yet part of a collection
+            state = obj._state = FieldState(1)
+            obj._idx = 0
+        # End try
+
+        if isinstance(value, PARAM_TYPES):
+            # Parameters are kept so that their values can be applied 
+            # again when they change (see `CropField.refresh()`)
+            try:
+                params = obj._state_params
+            except AttributeError:
+                params = obj._state_params = {}
+            # End try
+
+            params[self.name] = value
+        # End if
+
+        value = obj.get_nominal(value)
+        state.values[self.row, obj._idx] = np.nan if value is None else value
+    # End __set__()
+
+# End _FieldStateAttr()
+
+
+@slotted('_state', '_idx', '_rotation_idx', '_irrigated_volume', 
+         '_num_irrigation_events', '_irrigation_cost', 'crop', 'sow_ordinal', 
+         'harvest_ordinal', 'sowed', 'harvested', 'water_used', '_state_params',
+         exclude=FieldState.attributes)
 @dataclass
 class CropField(Component):
     '''Represents a field for cropping.'''
@@ -31,13 +279,62 @@ class CropField(Component):
     def __post_init__(self):
         self._irrigated_volume = {}
         self._num_irrigation_events = 0
+        self.harvest_ordinal = None
 
         if self.crop_rotation:
-            self.crop_rotation = it.cycle(self.crop_rotation)
+            # Crops are cycled through by position, so that the same
+            # rotation can be shared between fields
+            if not isinstance(self.crop_rotation, (list, tuple)):
+                self.crop_rotation = list(self.crop_rotation)
+
+            self._rotation_idx = -1
             self.set_next_crop()
         # self.ssm = 0.0  # soil moisture at season start
     # End __post_init__()
 
+    def refresh(self):
+        """Set field state given by parameters to their current values.
+
+        Called when parameter values change, see `ParameterRegistry.load()`.
+        """
+        try:
+            params = self._state_params
+        except AttributeError:
+            return
+        # End try
+
+        for attr, v in params.items():
+            setattr(self, attr, v)
+        # End for
+    # End refresh()
+
+    @property
+    def plant_date(self):
+        """Date of sowing, as a Timestamp. See `sow_ordinal`."""
+        return pd.Timestamp.fromordinal(self.sow_ordinal)
+
+    @plant_date.setter
+    def plant_date(self, value):
+        self.sow_ordinal = value if isinstance(value, (int, np.integer)) else value.toordinal()
+
+    @property
+    def harvest_date(self):
+        """Date of harvest for the current season, as a Timestamp. 
+
+        Not available until the season begins. See `harvest_ordinal`.
+        """
+        if self.harvest_ordinal is None:
+            raise AttributeError("Harvest date is not set until the season begins")
+        return pd.Timestamp.fromordinal(self.harvest_ordinal)
+
+    @harvest_date.setter
+    def harvest_date(self, value):
+        self.harvest_ordinal = value if isinstance(value, (int, np.integer)) else value.toordinal()
+
+    @harvest_date.deleter
+    def harvest_date(self):
+        self.harvest_ordinal = None
+
     @property
     def irrigated_volume(self):
         return sum(self._irrigated_volume.values())
@@ -156,9 +453,7 @@ class CropField(Component):
         * float : net irrigation depth as negative value
         """
         crop = self.crop
-        coefs = crop.get_stage_coefs(dt)
-
-        depl_frac = self.get_nominal(coefs['depletion_fraction'])
+        depl_frac = crop.depletion_fraction(dt)
         e_rootzone_m = (crop.root_depth_m * crop.effective_root_zone)
 
         soil_RAW = self.soil_TAW * depl_frac
@@ -201,7 +496,9 @@ class CropField(Component):
     # End calc_possible_area()
 
     def set_next_crop(self):
-        self.crop = next(self.crop_rotation)
+        rotation = self.crop_rotation
+        self._rotation_idx = (self._rotation_idx + 1) % len(rotation)
+        self.crop = rotation[self._rotation_idx]
         self.ini_state()
     # End set_next_crop()
 
@@ -220,11 +517,8 @@ class CropField(Component):
         self._irrigation_cost = 0.0
         self._num_irrigation_events = 0
 
-        try:
-            del self.harvest_date
-        except AttributeError:
-            # not an attribute, so is okay
-            pass
+        # Harvest is only scheduled once a season begins
+        self.harvest_ordinal = None
     # End reset()
 
     def total_income(self, yield_func, ssm, gsr, irrig, comps) -> float:
@@ -326,6 +620,12 @@ class CropField(Component):
 # End FarmField()
 
 
+# Soil water and area attributes are held in a FieldState, so that a 
+# collection of fields (e.g. a FarmZone) can update them in bulk.
+for _attr in FieldState.attributes:
+    setattr(CropField, _attr, _FieldStateAttr(_attr))
+
+
 if __name__ == '__main__':
     from agtor.Irrigation import Irrigation
     from agtor.Crop import Crop
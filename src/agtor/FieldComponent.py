@@ -1,11 +1,12 @@
 from typing import Tuple, Optional
 from dataclasses import dataclass
 
-from .Component import Component
+from .Component import Component, Versioned, slotted
 
 
+@slotted('maintenance_year', 'minor_maintenance_cost', 'major_maintenance_cost', '_version')
 @dataclass
-class Infrastructure(Component):
+class Infrastructure(Versioned, Component):
     """Represents generic farm infrastructure."""
     name: str
 
@@ -22,6 +23,10 @@ class Infrastructure(Component):
     major_maintenance_rate: float
 
     def __post_init__(self):
+        self.refresh()
+    # End __post_init__()
+
+    def refresh(self):
         minor_mr = self.minor_maintenance_rate
         major_mr = self.major_maintenance_rate
 
@@ -32,7 +37,7 @@ class Infrastructure(Component):
 
         self.minor_maintenance_cost = self.capital_cost * minor_mr
         self.major_maintenance_cost = self.capital_cost * major_mr
-    # End __post_init__()
+    # End refresh()
 
     def maintenance_cost(self, year_step: int) -> float:
         """Calculate maintenance costs.
@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 
 from agtor.data_interface import load_yaml, generate_params, sort_param_types
+from .Component import slotted
 from .FieldComponent import Infrastructure
 
+@slotted()
 @dataclass
 class Irrigation(Infrastructure):
     """On-farm irrigation infrastructure component"""
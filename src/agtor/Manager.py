@@ -1,9 +1,12 @@
 from typing import Dict, List, Optional
-from collections import OrderedDict
+from collections import OrderedDict, Counter
+import weakref
 
-from optlang import Constraint, Model, Objective, Variable
+import numpy as np
 
 from .Component import Component
+from .Solver import (AllocationStructure, AllocationProblem, AllocationResult, 
+                     SolutionCache, get_solver)
 from .consts import *
 
 
@@ -14,10 +17,285 @@ class Manager(object):
     Follows a set crop rotation.
     """
 
-    def __init__(self):
-        self.opt_model = Model(name='Farm Decision model')
+    def __init__(self, solver='auto', warm_start: bool = False,
+                 cache_size: int = 0, cache_tol: float = 1e-6):
+        """
+        Parameters
+        ----------
+        * solver : str or object, LP solver backend. One of 
+                   'auto' (greedy solver where it applies, otherwise optlang),
+                   'greedy', 'optlang', or a solver object (see `agtor.Solver`).
+                   Solver objects may provide `solve_batch(problems)` to 
+                   solve many LPs at once (see `solve_batch()`).
+        * warm_start : bool, start solving optlang models from the previous 
+                       solution. Faster, but where more than one solution is 
+                       optimal, the solution returned may depend on the 
+                       problems previously solved.
+        * cache_size : int, number of LP solutions to keep for reuse.
+                       Disabled if 0 (the default).
+        * cache_tol : float, LP inputs which differ by less than this 
+                      amount are treated as identical by the cache
+        """
+        self.solver = get_solver(solver, warm_start=warm_start)
+        self.cache = SolutionCache(cache_size, cache_tol) if cache_size > 0 else None
+
+        # Counts of LPs solved, and of LPs bypassed as their solution is trivial
+        self.stats = Counter(solved=0, bypassed=0)
+
+        # LP structures are built once per zone, see `_zone_structure()`
+        self._structures = {}
+
+        # Water application costs by zone `id()`, see `_application_costs()`.
+        # Zones are tracked by identity as zones run side by side (e.g. 
+        # in a `ZoneBatch`) may share a name.
+        self._app_costs = {}
     # End __init__()
 
+    def __getstate__(self):
+        # Cached costs refer to zones by identity, so are not kept
+        state = self.__dict__.copy()
+        state['_app_costs'] = {}
+
+        return state
+    # End __getstate__()
+
+    def invalidate_costs(self):
+        """Discard cached water application costs.
+
+        Costs are recalculated automatically when attributes of 
+        irrigation systems, pumps or water sources are set. Call this 
+        where values change otherwise, e.g. if a parameter object held 
+        by a component is modified.
+        """
+        self._app_costs.clear()
+    # End invalidate_costs()
+
+    def _application_costs(self, zone) -> tuple:
+        """Water application costs per ML for each irrigation system and water source.
+
+        Costs are calculated once for each zone and reused until one of
+        its irrigation systems, pumps or water sources is replaced or 
+        changed (see `Versioned`).
+
+        Returns
+        ---------
+        * tuple : Dict[int, int], row of each irrigation system by `id()`
+                  np.ndarray, pumping cost per ML (irrigation systems x water sources)
+                  np.ndarray, water fees per ML (irrigation systems x water sources)
+        """
+        irrigations = tuple(f.irrigation for f in zone.fields)
+        sources = tuple(w.source for w in zone.water_sources.values())
+
+        # Components are compared by identity, as costs are found by `id()`
+        components = irrigations + sources + tuple(ws.pump for ws in sources)
+        versions = [c._version for c in components]
+        key = id(zone)
+        cached = self._app_costs.get(key)
+        if (cached is not None) and (cached[1] == versions) \
+                and all(a is b for a, b in zip(cached[0], components)):
+            return cached[3]
+        # End if
+
+        rows = {}
+        for irrigation in irrigations:
+            rows.setdefault(id(irrigation), (len(rows), irrigation))
+        # End for
+
+        pump_costs = np.zeros((len(rows), len(sources)))
+        fees = np.zeros((len(rows), len(sources)))
+        for row, irrigation in rows.values():
+            i_pressure = irrigation.head_pressure
+            flow_rate = irrigation.flow_rate_Lps
+            for j, ws in enumerate(sources):
+                pump_costs[row, j] = ws.pump.pumping_costs_per_ML(flow_rate, ws.head + i_pressure)
+                fees[row, j] = ws.cost_per_ML
+            # End for
+        # End for
+
+        costs = ({k: row for k, (row, _) in rows.items()}, pump_costs, fees)
+
+        # Entries are discarded once the zone no longer exists
+        app_costs = self._app_costs
+        zone_ref = cached[2] if cached is not None else \
+            weakref.ref(zone, lambda _, key=key: app_costs.pop(key, None))
+        app_costs[key] = (components, versions, zone_ref, costs)
+
+        return costs
+    # End _application_costs()
+
+    def _field_application_cost(self, zone, field: Component, req_water_ML_ha: float) -> np.ndarray:
+        """Cost of applying water to a field from each water source, in zone order."""
+        rows, pump_costs, fees = self._application_costs(zone)
+        row = rows[id(field.irrigation)]
+
+        return (pump_costs[row] * req_water_ML_ha) + (fees[row] * req_water_ML_ha)
+    # End _field_application_cost()
+
+    def _zone_structure(self, kind: str, zone, dryland: tuple) -> AllocationStructure:
+        """Retrieve the LP structure for a zone, building it if needed.
+
+        The structure of the LP (fields x water sources) does not change 
+        within a zone, so it is built once and only bounds and objective 
+        coefficients change between calls.
+
+        Variables are ordered by field, then water source.
+
+        Parameters
+        ----------
+        * kind : str, type of LP, either 'area' or 'irrigation'
+        * zone : FarmZone
+        * dryland : tuple[bool], whether each field is dryland
+
+        Returns
+        ---------
+        * AllocationStructure
+        """
+        f_names = tuple(f.name for f in zone.fields)
+        ws_names = tuple(zone.water_sources)
+        signature = (f_names, ws_names, dryland)
+
+        key = (kind, zone.name)
+        cached = self._structures.get(key)
+        if (cached is not None) and (cached[0] == signature):
+            return cached[1]
+        # End if
+
+        num_ws = len(ws_names)
+        names = [f"{f_name}__".replace(" ", "_") + ws_name
+                 for f_name in f_names for ws_name in ws_names]
+        field_vars = [list(range(i * num_ws, (i+1) * num_ws)) 
+                      for i in range(len(f_names))]
+
+        if kind == 'area':
+            # Total irrigated area for a field cannot be greater than 
+            # field area or area possible with available water.
+            # Last group is the total area across all fields.
+            groups = field_vars + [list(range(len(names)))]
+        elif kind == 'irrigation':
+            # Area irrigated by each water source cannot be more than 
+            # possible area to be irrigated by that water source
+            groups = [list(range(j, len(names), num_ws)) for j in range(num_ws)]
+
+            # Total irrigation area cannot be more than available area
+            # (only applies to dryland fields, which are not irrigated)
+            dryland_vars = [i for f_vars, is_dry in zip(field_vars, dryland) 
+                            if is_dry for i in f_vars]
+            if dryland_vars:
+                groups.append(dryland_vars)
+        else:
+            raise ValueError(f"Unknown LP type: {kind}")
+        # End if
+
+        structure = AllocationStructure(names, groups)
+
+        # Results are reported in variable name order
+        structure.output_order = sorted(range(len(names)), key=lambda i: names[i])
+
+        # Name to position maps used to index into results
+        structure.field_index = {f_name: i for i, f_name in enumerate(f_names)}
+        structure.ws_index = {ws_name: j for j, ws_name in enumerate(ws_names)}
+        structure.output_keys = OrderedDict((names[i], i) for i in structure.output_order)
+
+        # Application costs are reported for irrigated fields only
+        structure.cost_keys = OrderedDict((names[i], i) 
+                                          for f_vars, is_dry in zip(field_vars, dryland) 
+                                          if not is_dry for i in f_vars)
+
+        self._structures[key] = (signature, structure)
+
+        return structure
+    # End _zone_structure()
+
+    def _solve(self, problem: AllocationProblem) -> AllocationResult:
+        """Solve an allocation LP, returning optimal values by field and water source."""
+        cache = self.cache
+        if cache is not None:
+            key = cache.key(problem)
+            x = cache.get(key)
+            if x is None:
+                x = self.solver.solve(problem)
+                cache.put(key, x)
+                self.stats['solved'] += 1
+            # End if
+        else:
+            x = self.solver.solve(problem)
+            self.stats['solved'] += 1
+        # End if
+
+        return self._result(problem, x)
+    # End _solve()
+
+    def _result(self, problem: AllocationProblem, x: np.ndarray) -> AllocationResult:
+        structure = problem.structure
+
+        return AllocationResult(x, structure.field_index, structure.ws_index, 
+                                structure.output_keys)
+    # End _result()
+
+    def solve_batch(self, problems: List[AllocationProblem]) -> List[AllocationResult]:
+        """Solve many allocation LPs at once.
+
+        Uses the `solve_batch()` method of the solver backend where 
+        available, otherwise problems are solved one at a time. 
+        Cached solutions are used where available (see `cache_size`).
+
+        Parameters
+        ----------
+        * problems : List[AllocationProblem]
+
+        Returns
+        ---------
+        * List[AllocationResult] : optimal values for each problem
+        """
+        cache = self.cache
+        solutions = [None] * len(problems)
+        keys = [None] * len(problems)
+        pending = []
+        for i, problem in enumerate(problems):
+            if cache is not None:
+                keys[i] = cache.key(problem)
+                solutions[i] = cache.get(keys[i])
+            # End if
+
+            if solutions[i] is None:
+                pending.append(i)
+        # End for
+
+        batch = [problems[i] for i in pending]
+        solve_batch = getattr(self.solver, 'solve_batch', None)
+        if solve_batch is not None:
+            xs = solve_batch(batch)
+        else:
+            xs = [self.solver.solve(problem) for problem in batch]
+        # End if
+
+        for i, x in zip(pending, xs):
+            if cache is not None:
+                cache.put(keys[i], x)
+
+            solutions[i] = x
+        # End for
+        self.stats['solved'] += len(pending)
+
+        return [self._result(problem, x) for problem, x in zip(problems, solutions)]
+    # End solve_batch()
+
+    def _no_irrigation(self, structure: AllocationStructure) -> tuple:
+        """Zero allocation result, in the same form as `optimize_irrigation()`.
+
+        Application costs are reported as zero, as no water is applied.
+        """
+        self.stats['bypassed'] += 1
+
+        num_vars = len(structure.names)
+        primals = AllocationResult(np.zeros(num_vars), structure.field_index, 
+                                   structure.ws_index, structure.output_keys)
+        app_cost = AllocationResult(np.zeros(num_vars), structure.field_index, 
+                                    structure.ws_index, structure.cost_keys)
+
+        return primals, app_cost
+    # End _no_irrigation()
+
     def optimize_irrigated_area(self, zone) -> Dict:
         """Apply Linear Programming to naively optimize irrigated area.
         
@@ -26,50 +304,39 @@ class Manager(object):
         Parameters
         ----------
         * zone : FarmZone object, representing a farm or a farming zone.
+
+        Returns
+        ---------
+        * AllocationResult : optimal area in hectares by field and water source
         """
-        calc = []
-        areas = []
-        constraints = []
         zone_ws = zone.water_sources
-        
-        total_avail_water = zone.avail_allocation
+        dryland = tuple(f.irrigation.name == 'dryland' for f in zone.fields)
+        structure = self._zone_structure('area', zone, dryland)
 
-        field_areas = {}
+        coefs = []
+        ubs = []
+        caps = []
         for f in zone.fields:
             area_to_consider = f.total_area_ha
-            did = f"{f.name}__".replace(" ", "_")
 
             naive_crop_income = f.crop.estimate_income_per_ha()
             naive_req_water = f.crop.water_use_ML_per_ha
-            app_cost_per_ML = self.ML_water_application_cost(zone, f, naive_req_water)
+            app_cost_per_ML = self._field_application_cost(zone, f, naive_req_water).tolist()
 
             pos_field_area = [w.allocation / naive_req_water
                                 for ws_name, w in zone_ws.items()
             ]
             pos_field_area = min(sum(pos_field_area), area_to_consider)
-            
-            field_areas[f.name] = {
-                ws_name: Variable(f"{did}{ws_name}", 
-                                  lb=0,
-                                  ub=min(w.allocation / naive_req_water, area_to_consider))
-                for ws_name, w in zone_ws.items()
-            }
 
-            # total_pump_cost = sum([ws.pump.maintenance_cost(year_step) for ws in zone_ws])
-            profits = [field_areas[f.name][ws_name] * 
-                       (naive_crop_income - app_cost_per_ML[ws_name])
-                       for ws_name in zone_ws
-            ]
+            ubs += [min(w.allocation / naive_req_water, area_to_consider)
+                    for w in zone_ws.values()]
 
-            calc += profits
-            curr_field_areas = list(field_areas[f.name].values())
-            areas += curr_field_areas
+            # total_pump_cost = sum([ws.pump.maintenance_cost(year_step) for ws in zone_ws])
+            coefs += [(naive_crop_income - ws_cost) for ws_cost in app_cost_per_ML]
 
             # Total irrigated area cannot be greater than field area
             # or area possible with available water
-            constraints += [
-                Constraint(sum(curr_field_areas), lb=0.0, ub=pos_field_area)
-            ]
+            caps.append(pos_field_area)
         # End for
 
         # for ws_name in zone_ws:
@@ -83,20 +350,10 @@ class Manager(object):
         #                     lb=0.0,
         #                     ub=zone.total_area_ha)]
 
-        constraints += [Constraint(sum(areas),
-                                   lb=0.0,
-                                   ub=zone.total_area_ha)]
+        caps.append(zone.total_area_ha)
 
-        # Generate appropriate OptLang model
-        model = Model.clone(self.opt_model)
-        model.objective = Objective(sum(calc), direction='max')
-        model.add(constraints)
-        model.optimize()
-
-        if model.status != 'optimal':
-            raise RuntimeError("Could not optimize!")
-
-        return model.primal_values
+        problem = AllocationProblem(structure, coefs, ubs, caps)
+        return self._solve(problem)
     # End optimize_irrigated_area()
     
     def optimize_irrigation(self, zone, dt: object) -> tuple:
@@ -126,33 +383,66 @@ class Manager(object):
         Parameters
         ----------
         * zone : FarmZone
-        * dt : datetime object, current datetime
+        * dt : datetime or int, current date or integer day ordinal
 
         Returns
         ---------
-        * Tuple : OrderedDict[str, float] : keys based on field and water source names
-                                            values are hectare area
-                  Float : $/ML cost of applying water
+        * Tuple : AllocationResult : hectare area by field and water source
+                  AllocationResult : $/ML cost of applying water by field and 
+                                     water source (irrigated fields only)
         """
-        model = self.opt_model
-        areas = []
-        profit = []
-        app_cost = OrderedDict()
-        constraints = []
+        problem, primals, app_cost = self.irrigation_problem(zone, dt)
+        if problem is not None:
+            primals = self._solve(problem)
+
+        return primals, app_cost
+    # End optimize_irrigation()
 
+    def irrigation_problem(self, zone, dt: object) -> tuple:
+        """Set up the irrigation LP solved by `optimize_irrigation()`.
+
+        The LP is not needed where the optimal solution is to not irrigate, 
+        in which case the (zero) solution is given instead.
+
+        Parameters
+        ----------
+        * zone : FarmZone
+        * dt : datetime or int, current date or integer day ordinal
+
+        Returns
+        ---------
+        * Tuple : AllocationProblem, or None if not needed
+                  AllocationResult, hectare area by field and water source
+                                    if no LP is needed, otherwise None
+                  AllocationResult, $/ML cost of applying water by field and 
+                                    water source (irrigated fields only)
+        """
         zone_ws = zone.water_sources
+        num_ws = len(zone_ws)
         total_irrigated_area = sum(map(lambda f: f.irrigated_area 
                                     if f.irrigated_area is not None 
                                     else 0.0, zone.fields))
-        field_area = {}
-        possible_area = {}
-        for f in zone.fields:
-            f_name = f.name
-            did = f"{f_name}__".replace(" ", "_")
-            
-            if f.irrigation.name == 'dryland':
-                areas += [Variable(f"{did}{ws_name}", lb=0, ub=0) 
-                            for ws_name in zone_ws]
+
+        dryland = tuple(f.irrigation.name == 'dryland' for f in zone.fields)
+        structure = self._zone_structure('irrigation', zone, dryland)
+
+        # Bypass the solver if no field can be irrigated or needs water,
+        # as the optimal solution is to not irrigate
+        if all(dryland) or all(w.allocation == 0.0 for w in zone_ws.values()):
+            return (None, *self._no_irrigation(structure))
+
+        req_water_mm = zone.calc_required_water(dt).tolist()
+        if all((req == 0.0) or is_dry for req, is_dry in zip(req_water_mm, dryland)):
+            return (None, *self._no_irrigation(structure))
+
+        app_cost = np.zeros((len(dryland), num_ws))
+
+        coefs = []
+        ubs = []
+        for i, (f, is_dry, f_req_water_mm) in enumerate(zip(zone.fields, dryland, req_water_mm)):
+            if is_dry:
+                coefs += [0.0] * num_ws
+                ubs += [0.0] * num_ws
                 continue
             # End if
 
@@ -164,71 +454,35 @@ class Manager(object):
 
             # estimated gross income - variable costs per ha
             crop_income_per_ha = f.crop.estimate_income_per_ha()
-            req_water_ML_ha = f.calc_required_water(dt) / ML_to_mm
+            req_water_ML_ha = f_req_water_mm / ML_to_mm
 
             if req_water_ML_ha == 0.0:
-                field_area[f_name] = {
-                    ws_name: Variable(f"{did}{ws_name}",
-                                      lb=0.0,
-                                      ub=0.0)
-                    for ws_name in zone_ws
-                }
+                ubs += [0.0] * num_ws
             else:
                 max_ws_area = zone.possible_area_by_allocation(f)
-
-                field_area[f_name] = {
-                    ws_name: Variable(f"{did}{ws_name}",
-                                      lb=0, 
-                                      ub=max_ws_area[ws_name])
-                    for ws_name in zone_ws
-                }
+                ubs += [max_ws_area[ws_name] for ws_name in zone_ws]
             # End if
 
             # Costs to pump needed water volume from each water source
-            app_cost_per_ML = self.ML_water_application_cost(zone, f, req_water_ML_ha)
-
-            app_cost.update({
-                f"{did}{k}": v
-                for k, v in app_cost_per_ML.items()
-            })
-
-            profit += [
-                (crop_income_per_ha 
-                - (app_cost_per_ML[ws_name] * req_water_ML_ha)
-                ) * field_area[f_name][ws_name]
-                for ws_name in zone_ws
-            ]
-        # End for
+            app_cost[i] = self._field_application_cost(zone, f, req_water_ML_ha)
 
-        # Total irrigation area cannot be more than available area
-        constraints += [Constraint(sum(areas),
-                                   lb=0.0,
-                                   ub=min(total_irrigated_area, zone.total_area_ha))
-                        ]
+            coefs += [(crop_income_per_ha - (ws_cost * req_water_ML_ha))
+                      for ws_cost in app_cost[i].tolist()]
+        # End for
 
         # 0 <= field1*sw + field2*sw + field_n*sw <= possible area to be irrigated by sw
-        for ws_name, w in zone_ws.items():
-            alloc = w.allocation
-            pos_area = zone.possible_irrigation_area(alloc)
-
-            f_ws_var = []
-            for f in zone.fields:
-                f_ws_var += [field_area[f.name][ws_name]]
-            # End for
+        caps = [zone.possible_irrigation_area(w.allocation) for w in zone_ws.values()]
 
-            constraints += [Constraint(sum(f_ws_var),
-                            lb=0.0,
-                            ub=pos_area)]
-        # End for
+        # Total irrigation area cannot be more than available area
+        if any(dryland):
+            caps.append(min(total_irrigated_area, zone.total_area_ha))
 
-        # Generate appropriate OptLang model
-        model = Model.clone(self.opt_model)
-        model.objective = Objective(sum(profit), direction='max')
-        model.add(constraints)
-        model.optimize()
+        app_cost = AllocationResult(app_cost, structure.field_index, 
+                                    structure.ws_index, structure.cost_keys)
 
-        return model.primal_values, app_cost
-    # End optimize_irrigation()
+        problem = AllocationProblem(structure, coefs, ubs, caps)
+        return problem, None, app_cost
+    # End irrigation_problem()
 
     def possible_area(self, zone, field: Component, ws_name=Optional[str]) -> float:
         if ws_name:
@@ -248,12 +502,13 @@ class Manager(object):
         return area_to_consider
     # End possible_area()
 
-    def get_optimum_irrigated_area(self, field: Component, primals: Dict) -> float:
-        """Extract total irrigated area from OptLang optimized results."""
-        return sum([v for k, v in primals.items() if field.name in k])
+    def get_optimum_irrigated_area(self, field: Component, primals: AllocationResult) -> float:
+        """Extract total irrigated area for a field from optimized results."""
+        return primals.field_total(field.name)
     # End get_optimum_irrigated_area()
 
-    def perc_irrigation_sources(self, field: Component, water_sources: List, primals: Dict) -> Dict:
+    def perc_irrigation_sources(self, field: Component, water_sources: List, 
+                                primals: AllocationResult) -> Dict:
         """Calculate percentage of area to be watered by a specific water source.
 
         Returns
@@ -261,15 +516,12 @@ class Manager(object):
         * Dict[str, float] : name of water source as key and perc. area as value
         """
         area = field.irrigated_area
-        opt = {}
-
-        for k in primals:
-            for ws_name in water_sources:
-                if (field.name in k) and (ws_name in k):
-                    opt[ws_name] = primals[k] / area
-        # End for
+        f_idx = primals.field_index[field.name]
+        ws_index = primals.ws_index
+        values = primals.array
 
-        return opt
+        return {ws_name: values.item(f_idx, ws_index[ws_name]) / area 
+                for ws_name in water_sources}
     # End perc_irrigation_sources()
 
     def ML_water_application_cost(self, zone, field: Component, req_water_ML_ha: float) -> Dict:
@@ -279,19 +531,9 @@ class Manager(object):
         -------
         * dict[str, float] : water source name and cost per ML
         """
-        zone_ws = zone.water_sources
-        irrigation = field.irrigation
-        i_pressure = irrigation.head_pressure
-        flow_rate = irrigation.flow_rate_Lps
-
-        costs = {
-            ws_name: (w.source.pump.pumping_costs_per_ML(flow_rate, 
-                                                w.source.head + i_pressure) 
-                                                 * req_water_ML_ha) 
-                                                 + (w.source.cost_per_ML*req_water_ML_ha)
-            for ws_name, w in zone_ws.items()
-        }
-        return costs
+        costs = self._field_application_cost(zone, field, req_water_ML_ha).tolist()
+
+        return dict(zip(zone.water_sources, costs))
     # End ML_water_application_cost()
 
     def calc_ML_pump_costs(self, zone, 
@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from typing import List, Tuple, Dict
 
+from .Component import slotted
 from .FieldComponent import Infrastructure
 
+@slotted()
 @dataclass
 class Pump(Infrastructure):
     """On-farm pump."""
@@ -0,0 +1,272 @@
+"""Model-wide registry holding parameter values in a single vector."""
+from typing import Dict, List, Optional, Sequence
+from numbers import Real
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .Component import (Component, Versioned, RegisteredParameter,
+                        PARAM_TYPES, _nominal, _attributes)
+from .Zone import FarmZone
+
+
+class ParameterRegistry(object):
+
+    """Assigns each numeric parameter of a model an integer slot in a vector of values.
+
+    Binding a zone (see `bind()`) replaces its parameter objects with
+    `RegisteredParameter`s, so that components read their values from
+    `values`. Frozen components (see `Component.freeze()`) hold plain
+    values, which are updated by `load()` instead.
+
+    Loading a sample of parameter values is then a copy into `values`,
+    with attributes derived from changed values recalculated (see
+    `Component.refresh()`). Parameters are identified by position
+    rather than by id, giving a compact representation of samples
+    to send between processes or to checkpoint.
+
+    Parameters with non-numeric values (e.g. dates) are not registered.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.definitions = []
+        self.values = np.empty(0)
+        self._index = {}
+
+        # Locations holding each parameter value, as (component, attribute, keys)
+        self._bindings = []
+    # End __init__()
+
+    @classmethod
+    def from_zones(cls, *zones: FarmZone) -> 'ParameterRegistry':
+        """Create a registry of all parameters of the given zones."""
+        registry = cls()
+        for z in zones:
+            registry.bind(z)
+        # End for
+
+        return registry
+    # End from_zones()
+
+    def __len__(self):
+        return len(self.names)
+    # End __len__()
+
+    def __contains__(self, name: str):
+        return name in self._index
+    # End __contains__()
+
+    def slot(self, name: str) -> int:
+        """Position of a parameter in `values`, by parameter id."""
+        return self._index[name]
+    # End slot()
+
+    def register(self, param) -> RegisteredParameter:
+        """Assign a parameter a slot, if it does not already have one.
+
+        Parameters
+        ----------
+        * param : EMA Workbench parameter
+
+        Returns
+        ---------
+        * RegisteredParameter : reference to the parameter value
+        """
+        if isinstance(param, RegisteredParameter):
+            if param.registry is not self:
+                raise ValueError(f"Parameter already registered elsewhere: {param.name}")
+
+            return param
+        # End if
+
+        name = param.name
+        slot = self._index.get(name)
+        if slot is None:
+            slot = self._index[name] = len(self.names)
+            self.names.append(name)
+            self.definitions.append(param)
+            self.values = np.append(self.values, float(_nominal(param)))
+            self._bindings.append([])
+        # End if
+
+        return RegisteredParameter(self, slot, self.definitions[slot])
+    # End register()
+
+    def bind(self, obj):
+        """Register the parameters of a zone or component, and of those it contains.
+
+        Parameter objects held by unfrozen components are replaced
+        with references to the registry. Parameters given for field
+        state (e.g. `CropField.total_area_ha`) are registered too, with
+        loaded values applied to the state (see `CropField.refresh()`).
+        """
+        seen = set()
+        if isinstance(obj, FarmZone):
+            for f in obj.fields:
+                self._bind(f, seen)
+            for ws in obj.water_sources.values():
+                self._bind(ws.source, seen)
+        else:
+            self._bind(obj, seen)
+        # End if
+    # End bind()
+
+    def _bind(self, comp: Component, seen: set):
+        if id(comp) in seen:
+            return
+        seen.add(id(comp))
+
+        attrs = _attributes(comp)
+        for v in attrs.values():
+            if isinstance(v, Component):
+                self._bind(v, seen)
+            elif isinstance(v, (list, tuple)):
+                for item in v:
+                    if isinstance(item, Component):
+                        self._bind(item, seen)
+                # End for
+            # End if
+        # End for
+
+        # Frozen components hold parameter objects apart from their values
+        frozen = comp._frozen
+        params = comp._params if frozen else attrs
+        for attr, v in list(params.items()):
+            replaced = self._bind_value(comp, attr, (), v)
+            if replaced is v:
+                continue
+
+            if frozen:
+                comp._params[attr] = replaced
+            else:
+                object.__setattr__(comp, attr, replaced)
+        # End for
+    # End _bind()
+
+    def _bind_value(self, comp: Component, attr: str, keys: tuple, v):
+        """Register parameters in an attribute value, giving the value with references in place."""
+        if isinstance(v, dict):
+            replaced = {k: self._bind_value(comp, attr, keys + (k, ), item)
+                        for k, item in v.items()}
+            if any(replaced[k] is not item for k, item in v.items()):
+                if comp._frozen:
+                    return replaced
+
+                # Nested parameters are replaced in place, as the dict may be shared
+                v.update(replaced)
+            # End if
+
+            return v
+        # End if
+
+        if not isinstance(v, PARAM_TYPES) or not isinstance(_nominal(v), Real):
+            return v
+
+        ref = self.register(v)
+        self._bindings[ref.slot].append((comp, attr, keys))
+
+        return ref
+    # End _bind_value()
+
+    def vector(self, override: Optional[Dict] = None) -> np.ndarray:
+        """Parameter values with the given values replaced, by parameter id.
+
+        Parameters
+        ----------
+        * override : Dict[str, float], values by parameter id
+
+        Returns
+        ---------
+        * np.ndarray : copy of `values`, with given values replaced
+        """
+        values = self.values.copy()
+        for name, v in (override or {}).items():
+            values[self._index[name]] = v
+        # End for
+
+        return values
+    # End vector()
+
+    def align(self, samples: pd.DataFrame) -> np.ndarray:
+        """Sample matrix with a column for each slot.
+
+        Parameters without a column in `samples` take their current value.
+        Columns that are not registered parameters are ignored with a warning.
+
+        Parameters
+        ----------
+        * samples : DataFrame, parameter values with columns named by
+                    parameter id, e.g. from `data_interface.get_samples()`
+
+        Returns
+        ---------
+        * np.ndarray : samples x slots
+        """
+        unknown = [c for c in samples.columns if c not in self._index]
+        if unknown:
+            warnings.warn(f"Sample columns are not registered parameters: {unknown}")
+
+        matrix = np.tile(self.values, (len(samples), 1))
+        for c in samples.columns:
+            if c in self._index:
+                matrix[:, self._index[c]] = samples[c].to_numpy(dtype=np.float64)
+        # End for
+
+        return matrix
+    # End align()
+
+    def load(self, values: Sequence[float]) -> List[int]:
+        """Set all parameter values at once.
+
+        Values of frozen components are updated, and components with
+        changed values recalculate attributes derived from them.
+
+        Parameters
+        ----------
+        * values : Sequence[float], value for each slot
+
+        Returns
+        ---------
+        * List[int] : slots whose values changed
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != self.values.shape:
+            raise ValueError(f"Expected {len(self.values)} values. Got shape: {values.shape}")
+
+        changed = np.flatnonzero(values != self.values).tolist()
+        np.copyto(self.values, values)
+
+        refresh = {}
+        for slot in changed:
+            v = self.values.item(slot)
+            for comp, attr, keys in self._bindings[slot]:
+                refresh[id(comp)] = comp
+                if not comp._frozen:
+                    continue
+
+                if not keys:
+                    setattr(comp, attr, v)
+                    continue
+                # End if
+
+                target = object.__getattribute__(comp, attr)
+                for k in keys[:-1]:
+                    target = target[k]
+                target[keys[-1]] = v
+            # End for
+        # End for
+
+        for comp in refresh.values():
+            comp.refresh()
+
+            # Values read through the registry do not pass through `__setattr__()`
+            if isinstance(comp, Versioned):
+                comp._touch()
+        # End for
+
+        return changed
+    # End load()
+
+# End ParameterRegistry()
@@ -0,0 +1,512 @@
+"""Solver backends for the allocation LPs used by farm managers.
+
+The LPs solved by a `Manager` share a simple structure:
+
+.. math::
+    max \\sum_i c_i x_i
+
+subject to :math:`0 <= x_i <= u_i` and, for each group of variables
+:math:`g`, :math:`\\sum_{i \\in g} x_i <= cap_g`.
+
+When the groups form a laminar family (any two groups are either disjoint
+or one contains the other), the problem can be solved exactly by greedily
+allocating to variables in order of decreasing profit. Otherwise a
+general LP solver (via optlang) is used.
+"""
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+from optlang import Constraint, Model, Objective, Variable
+
+try:
+    from swiglpk import glp_std_basis
+except ImportError:
+    # GLPK is not available, optlang will use another solver
+    glp_std_basis = None
+
+
+class AllocationStructure(object):
+
+    """The fixed structure of an allocation LP: variables and constraint groups.
+
+    Structures are built once (e.g. per zone) and reused across solves.
+    """
+
+    def __init__(self, names: List[str], groups: List[List[int]]):
+        """
+        Parameters
+        ----------
+        * names : List[str], name of each variable
+        * groups : List[List[int]], variable positions in each constraint group
+        """
+        self.names = list(names)
+        self.groups = [np.asarray(g, dtype=np.int64) for g in groups]
+
+        # Rank of each variable when sorted by name, used to break ties
+        self.rank = np.argsort(np.argsort(self.names, kind='stable'), kind='stable')
+
+        self.membership = [[] for _ in self.names]
+        for g_idx, g in enumerate(self.groups):
+            for i in g.tolist():
+                self.membership[i].append(g_idx)
+        # End for
+
+        # Group membership of each variable (variables x groups)
+        self.member_matrix = np.zeros((len(self.names), len(self.groups)), dtype=bool)
+        for g_idx, g in enumerate(self.groups):
+            self.member_matrix[g, g_idx] = True
+        # End for
+
+        self.is_laminar = self._check_laminar()
+    # End __init__()
+
+    def _check_laminar(self) -> bool:
+        """True if any two groups are either disjoint or nested."""
+        sets = [set(g.tolist()) for g in self.groups]
+        for i, a in enumerate(sets):
+            for b in sets[i+1:]:
+                if (a & b) and not (a <= b or b <= a):
+                    return False
+            # End for
+        # End for
+
+        return True
+    # End _check_laminar()
+
+# End AllocationStructure()
+
+
+class AllocationProblem(object):
+
+    """An allocation LP instance: a structure with coefficients and bounds."""
+
+    def __init__(self, structure: AllocationStructure, coefs, ub, caps):
+        """
+        Parameters
+        ----------
+        * structure : AllocationStructure
+        * coefs : array-like, objective coefficient for each variable
+        * ub : array-like, upper bound of each variable (lower bounds are 0)
+        * caps : array-like, upper bound of the sum of each constraint group
+        """
+        self.structure = structure
+        self.coefs = np.asarray(coefs, dtype=np.float64)
+        self.ub = np.asarray(ub, dtype=np.float64)
+        self.caps = np.asarray(caps, dtype=np.float64)
+    # End __init__()
+
+    def objective_value(self, x: np.ndarray) -> float:
+        return float(np.dot(self.coefs, x))
+    # End objective_value()
+
+# End AllocationProblem()
+
+
+class AllocationResult(Mapping):
+
+    """Allocation values for each field and water source.
+
+    Values are held in a dense (fields x water sources) array, with
+    `field_index` and `ws_index` mapping names to rows and columns.
+
+    Also acts as a read-only mapping of variable names
+    (`{field name}__{water source name}`) to values.
+    """
+
+    def __init__(self, values: np.ndarray, field_index: Dict[str, int],
+                 ws_index: Dict[str, int], keys: Dict[str, int]):
+        """
+        Parameters
+        ----------
+        * values : np.ndarray, value for each field (rows) and water source (columns)
+        * field_index : Dict[str, int], row of each field by name
+        * ws_index : Dict[str, int], column of each water source by name
+        * keys : Dict[str, int], flattened position of each variable by name,
+                 in the order variables are to be reported
+        """
+        self.array = np.asarray(values, dtype=np.float64).reshape(len(field_index), len(ws_index))
+        self.field_index = field_index
+        self.ws_index = ws_index
+        self._keys = keys
+    # End __init__()
+
+    def __getitem__(self, name: str) -> float:
+        return self.array.item(self._keys[name])
+    # End __getitem__()
+
+    def __iter__(self):
+        return iter(self._keys)
+    # End __iter__()
+
+    def __len__(self):
+        return len(self._keys)
+    # End __len__()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self.items())})"
+    # End __repr__()
+
+    def value(self, field_name: str, ws_name: str) -> float:
+        """Value for a field and water source."""
+        return self.array.item(self.field_index[field_name], self.ws_index[ws_name])
+    # End value()
+
+    def field_values(self, field_name: str) -> np.ndarray:
+        """Values for a field, for each water source."""
+        return self.array[self.field_index[field_name]]
+    # End field_values()
+
+    def field_total(self, field_name: str) -> float:
+        """Sum of values for a field across all water sources."""
+        return float(self.field_values(field_name).sum())
+    # End field_total()
+
+# End AllocationResult()
+
+
+class GreedySolver(object):
+
+    """Exact solver for allocation problems with laminar constraint groups.
+
+    Variables are filled in order of decreasing profit, each up to the
+    smallest remaining capacity of its bound and groups. For laminar
+    groups with unit coefficients the feasible region is a polymatroid,
+    for which this greedy allocation is optimal. Ties are broken by
+    variable name.
+    """
+
+    name = 'greedy'
+
+    def applies(self, problem: AllocationProblem) -> bool:
+        return problem.structure.is_laminar
+    # End applies()
+
+    def solve(self, problem: AllocationProblem) -> np.ndarray:
+        structure = problem.structure
+        if not structure.is_laminar:
+            raise ValueError("Greedy solver requires laminar constraint groups")
+
+        coefs = problem.coefs
+        ub = problem.ub.tolist()
+        remaining = np.maximum(problem.caps, 0.0).tolist()
+        membership = structure.membership
+
+        x = [0.0] * len(ub)
+        order = np.lexsort((structure.rank, -coefs)).tolist()
+        coefs = coefs.tolist()
+        for i in order:
+            if coefs[i] <= 0.0:
+                # No further profitable allocation
+                break
+
+            amount = ub[i]
+            for g in membership[i]:
+                if remaining[g] < amount:
+                    amount = remaining[g]
+            # End for
+
+            if amount <= 0.0:
+                continue
+
+            x[i] = amount
+            for g in membership[i]:
+                remaining[g] -= amount
+            # End for
+        # End for
+
+        return np.array(x)
+    # End solve()
+
+    def solve_batch(self, problems: List[AllocationProblem]) -> List[np.ndarray]:
+        """Solve many problems, stepping through problems with the same structure together.
+
+        Gives the same solutions as calling `solve()` for each problem.
+        """
+        by_structure = OrderedDict()
+        for i, problem in enumerate(problems):
+            by_structure.setdefault(id(problem.structure), []).append(i)
+        # End for
+
+        solutions = [None] * len(problems)
+        for positions in by_structure.values():
+            xs = self._solve_stacked([problems[i] for i in positions])
+            for i, x in zip(positions, xs):
+                solutions[i] = x
+            # End for
+        # End for
+
+        return solutions
+    # End solve_batch()
+
+    def _solve_stacked(self, problems: List[AllocationProblem]) -> np.ndarray:
+        """Greedy allocation for problems sharing a structure, one row per problem."""
+        structure = problems[0].structure
+        if not structure.is_laminar:
+            raise ValueError("Greedy solver requires laminar constraint groups")
+
+        coefs = np.array([p.coefs for p in problems])
+        ub = np.array([p.ub for p in problems])
+        remaining = np.maximum(np.array([p.caps for p in problems]), 0.0)
+        member = structure.member_matrix
+
+        num_problems, num_vars = coefs.shape
+        rows = np.arange(num_problems)
+        rank = np.broadcast_to(structure.rank, coefs.shape)
+        order = np.lexsort((rank, -coefs), axis=-1)
+
+        x = np.zeros(coefs.shape)
+        for k in range(num_vars):
+            idx = order[:, k]
+            in_group = member[idx]
+
+            amount = np.minimum(ub[rows, idx], 
+                                np.where(in_group, remaining, np.inf).min(axis=1, initial=np.inf))
+
+            # Only profitable allocations are made
+            amount = np.where((coefs[rows, idx] > 0.0) & (amount > 0.0), amount, 0.0)
+
+            x[rows, idx] = amount
+            remaining -= in_group * amount[:, None]
+        # End for
+
+        return x
+    # End _solve_stacked()
+
+# End GreedySolver()
+
+
+class OptlangSolver(object):
+
+    """General LP solver using optlang.
+
+    Models are built once per problem structure and updated in place
+    with new bounds and objective coefficients on later solves.
+    """
+
+    name = 'optlang'
+
+    def __init__(self, warm_start: bool = False):
+        """
+        Parameters
+        ----------
+        * warm_start : bool, start solving LP models from the previous
+                       solution. Faster, but where more than one solution is
+                       optimal, the solution returned may depend on the
+                       problems previously solved.
+        """
+        self.warm_start = warm_start
+        self._models = {}
+    # End __init__()
+
+    def applies(self, problem: AllocationProblem) -> bool:
+        return True
+    # End applies()
+
+    def _model(self, structure: AllocationStructure) -> tuple:
+        """Retrieve the optlang model for a structure, building it if needed."""
+        key = id(structure)
+        cached = self._models.get(key)
+        if (cached is not None) and (cached[0] is structure):
+            return cached
+        # End if
+
+        variables = [Variable(name, lb=0.0, ub=0.0) for name in structure.names]
+        constraints = [Constraint(sum([variables[i] for i in g.tolist()]), lb=0.0, ub=0.0)
+                       for g in structure.groups]
+
+        model = Model(name='Farm Decision model')
+
+        # Variables are added in name order, which matches the order
+        # optlang gives variables taken from symbolic expressions.
+        # This keeps the choice between equally optimal solutions
+        # consistent with freshly built models.
+        model.add(sorted(variables, key=lambda v: v.name))
+        model.add(constraints)
+        model.objective = Objective(sum(variables), direction='max')
+
+        built = (structure, model, variables, constraints)
+        self._models[key] = built
+
+        return built
+    # End _model()
+
+    def solve(self, problem: AllocationProblem) -> np.ndarray:
+        _, model, variables, constraints = self._model(problem.structure)
+
+        for v, ub in zip(variables, problem.ub.tolist()):
+            v.ub = ub
+        # End for
+
+        for c, cap in zip(constraints, problem.caps.tolist()):
+            c.ub = cap
+        # End for
+
+        model.objective.set_linear_coefficients(dict(zip(variables, problem.coefs.tolist())))
+
+        # Unless warm-starting, reset the solver basis so results do not
+        # depend on previously solved problems
+        is_glpk = model.interface.__name__ == 'optlang.glpk_interface'
+        if (not self.warm_start) and is_glpk:
+            glp_std_basis(model.problem)
+        # End if
+
+        model.optimize()
+
+        if model.status != 'optimal':
+            raise RuntimeError("Could not optimize!")
+
+        return np.array([v.primal for v in variables])
+    # End solve()
+
+    def solve_batch(self, problems: List[AllocationProblem]) -> List[np.ndarray]:
+        return [self.solve(problem) for problem in problems]
+    # End solve_batch()
+
+# End OptlangSolver()
+
+
+class AutoSolver(object):
+
+    """Uses the greedy solver where it applies, otherwise optlang."""
+
+    name = 'auto'
+
+    def __init__(self, warm_start: bool = False):
+        self.greedy = GreedySolver()
+        self.optlang = OptlangSolver(warm_start=warm_start)
+    # End __init__()
+
+    def applies(self, problem: AllocationProblem) -> bool:
+        return True
+    # End applies()
+
+    def solve(self, problem: AllocationProblem) -> np.ndarray:
+        if self.greedy.applies(problem):
+            return self.greedy.solve(problem)
+
+        return self.optlang.solve(problem)
+    # End solve()
+
+    def solve_batch(self, problems: List[AllocationProblem]) -> List[np.ndarray]:
+        """Solve many problems, batching those the greedy solver applies to."""
+        greedy = [i for i, p in enumerate(problems) if self.greedy.applies(p)]
+        solutions = [None] * len(problems)
+        for i, x in zip(greedy, self.greedy.solve_batch([problems[i] for i in greedy])):
+            solutions[i] = x
+        # End for
+
+        for i, problem in enumerate(problems):
+            if solutions[i] is None:
+                solutions[i] = self.optlang.solve(problem)
+        # End for
+
+        return solutions
+    # End solve_batch()
+
+# End AutoSolver()
+
+
+class SolutionCache(object):
+
+    """Bounded LRU cache of allocation LP solutions.
+
+    Problems are keyed on their structure and on their coefficients,
+    bounds and group capacities, quantized to the given tolerance.
+    Problems that differ by less than the tolerance share a solution.
+    """
+
+    def __init__(self, maxsize: int = 1024, tol: float = 1e-6):
+        """
+        Parameters
+        ----------
+        * maxsize : int, maximum number of solutions to keep
+        * tol : float, quantization step applied to problem values
+        """
+        if maxsize < 1:
+            raise ValueError(f"Cache size must be at least 1. Got: {maxsize}")
+
+        if tol <= 0.0:
+            raise ValueError(f"Cache tolerance must be positive. Got: {tol}")
+
+        self.maxsize = maxsize
+        self.tol = tol
+        self.hits = 0
+        self.misses = 0
+        self._solutions = OrderedDict()
+    # End __init__()
+
+    def __len__(self):
+        return len(self._solutions)
+    # End __len__()
+
+    def key(self, problem: AllocationProblem) -> tuple:
+        """Quantized fingerprint of a problem."""
+        values = np.concatenate((problem.coefs, problem.ub, problem.caps))
+        quantized = np.round(values / self.tol).astype(np.int64)
+
+        return (problem.structure, quantized.tobytes())
+    # End key()
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        """Retrieve a cached solution, or None if not found."""
+        x = self._solutions.get(key)
+        if x is None:
+            self.misses += 1
+            return None
+        # End if
+
+        self.hits += 1
+        self._solutions.move_to_end(key)
+
+        return x.copy()
+    # End get()
+
+    def put(self, key: tuple, x: np.ndarray):
+        """Store a solution, evicting the least recently used if full."""
+        self._solutions[key] = x.copy()
+        self._solutions.move_to_end(key)
+        if len(self._solutions) > self.maxsize:
+            self._solutions.popitem(last=False)
+    # End put()
+
+    def clear(self):
+        self._solutions.clear()
+        self.hits = 0
+        self.misses = 0
+    # End clear()
+
+    @property
+    def stats(self) -> dict:
+        """Cache hits, misses and current size."""
+        return {'hits': self.hits, 'misses': self.misses, 
+                'size': len(self._solutions), 'maxsize': self.maxsize}
+    # End stats()
+
+# End SolutionCache()
+
+
+def get_solver(solver='auto', warm_start: bool = False):
+    """Get a solver backend by name.
+
+    Parameters
+    ----------
+    * solver : str or object, one of 'auto', 'greedy' or 'optlang', or
+               an object with `applies(problem)` and `solve(problem)` methods
+    * warm_start : bool, warm-start the optlang solver (see `OptlangSolver`)
+    """
+    if not isinstance(solver, str):
+        return solver
+
+    if solver == 'auto':
+        return AutoSolver(warm_start=warm_start)
+    elif solver == 'greedy':
+        return GreedySolver()
+    elif solver == 'optlang':
+        return OptlangSolver(warm_start=warm_start)
+    # End if
+
+    raise ValueError(f"Unknown solver: {solver}")
+# End get_solver()
@@ -0,0 +1,227 @@
+"""Build zones for rows of a sample matrix from a template compiled once."""
+from typing import Callable, Dict, List, Sequence
+from copy import deepcopy
+from dataclasses import fields
+import warnings
+
+from .Component import Component, PARAM_TYPES, _nominal, _frozen_class
+from .Zone import FarmZone
+
+
+class _Slot(object):
+
+    """Position of a parameter value in a sample row."""
+
+    __slots__ = ('col', )
+
+    def __init__(self, col: int):
+        self.col = col
+    # End __init__()
+
+# End _Slot()
+
+
+class _Ref(object):
+
+    """An object created by an earlier build step."""
+
+    __slots__ = ('step', )
+
+    def __init__(self, step: int):
+        self.step = step
+    # End __init__()
+
+# End _Ref()
+
+
+def _substitutions(args) -> List[tuple]:
+    """Entries of build step arguments to fill in, as (key, source, position).
+
+    Sources are 0 for sample values and 1 for objects already built.
+    """
+    keys = args.keys() if isinstance(args, dict) else range(len(args))
+    subs = []
+    for k in keys:
+        v = args[k]
+        if isinstance(v, _Slot):
+            subs.append((k, 0, v.col))
+        elif isinstance(v, _Ref):
+            subs.append((k, 1, v.step))
+    # End for
+
+    return subs
+# End _substitutions()
+
+
+def _frozen_factory(cls) -> Callable:
+    """Create components as frozen, as they hold plain values (see `Component.freeze()`)."""
+    frozen = _frozen_class(cls)
+
+    def create(**kwargs):
+        obj = frozen(**kwargs)
+        obj._params = {}
+        return obj
+    # End create()
+
+    return create
+# End _frozen_factory()
+
+
+def _init_args(obj) -> Dict:
+    """Arguments that recreate an object with its dataclass constructor."""
+    if isinstance(obj, FarmZone):
+        # Water sources are replaced by allocation records on creation
+        return {
+            'name': obj.name,
+            'climate': obj.climate,
+            'fields': obj.fields,
+            'water_sources': [ws.source for ws in obj.water_sources.values()],
+            'allocation': obj._allocation
+        }
+    # End if
+
+    # Parameter objects are taken as stored
+    return {f.name: object.__getattribute__(obj, f.name) for f in fields(obj) if f.init}
+# End _init_args()
+
+
+class ZoneTemplate(object):
+
+    """A zone compiled into the steps needed to recreate it with given parameter values.
+
+    Compiling walks the components of a zone once, recording how each
+    is constructed and the position of each parameter in rows of a
+    sample matrix (e.g. from `data_interface.get_samples()`). Zones are
+    then built from a row by calling component constructors directly,
+    without parsing specifications, creating parameter objects or
+    matching parameter ids.
+
+    Components and containers shared in the original zone (e.g. a crop
+    rotation shared by fields) are shared in each built zone. Built
+    components hold plain values rather than parameter objects, and
+    are created frozen (see `Component.freeze()`). Parameters not in 
+    the sample matrix take their nominal value.
+    """
+
+    def __init__(self, zone: FarmZone, columns: Sequence[str]):
+        """
+        Parameters
+        ----------
+        * zone : FarmZone, zone to compile, as created. Must not have been
+                 frozen or run.
+        * columns : Sequence[str], parameter ids of sample matrix columns
+        """
+        self.columns = list(columns)
+        self._col_idx = {c: i for i, c in enumerate(self.columns)}
+        self._steps = []
+        self._memo = {}
+        self._compiled = []
+        self._used = set()
+
+        self._compile(zone)
+
+        unused = [c for c in self.columns if c not in self._used]
+        if unused:
+            warnings.warn(f"Sample columns not used by any component: {unused}")
+
+        del self._memo, self._compiled
+    # End __init__()
+
+    @classmethod
+    def from_specs(cls, build_zone: Callable, specs: Dict, climate,
+                   columns: Sequence[str]) -> 'ZoneTemplate':
+        """Compile the zone created by a zone-building function.
+
+        Parameters
+        ----------
+        * build_zone : Callable, function taking (specs, climate, override)
+                       and returning a `FarmZone`, see `run_ensemble()`
+        * specs : Dict, component specifications, see `load_specs()`
+        * climate : Climate, climate data for built zones
+        * columns : Sequence[str], parameter ids of sample matrix columns
+        """
+        return cls(build_zone(deepcopy(specs), climate, {}), columns)
+    # End from_specs()
+
+    @property
+    def parameters(self) -> List[str]:
+        """Ids of sample columns used by components."""
+        return [c for c in self.columns if c in self._used]
+    # End parameters()
+
+    def _compile(self, obj):
+        """Record the build steps for an object, giving a placeholder for its value."""
+        if isinstance(obj, PARAM_TYPES):
+            col = self._col_idx.get(obj.name)
+            if col is None:
+                return _nominal(obj)
+
+            self._used.add(obj.name)
+            return _Slot(col)
+        # End if
+
+        # Shared data (e.g. climate) is referenced rather than recreated
+        is_component = isinstance(obj, (Component, FarmZone)) and len(fields(obj)) > 0
+        if not (is_component or isinstance(obj, (dict, list, tuple))):
+            return obj
+
+        ref = self._memo.get(id(obj))
+        if ref is not None:
+            return ref
+
+        # Containers are build steps of their own, so the
+        # arguments of each step hold no nested containers
+        if is_component:
+            if isinstance(obj, Component) and obj._frozen:
+                raise ValueError(f"Cannot compile frozen component: {obj.name}")
+
+            args = {k: self._compile(v) for k, v in _init_args(obj).items()}
+            factory = _frozen_factory(type(obj)) if isinstance(obj, Component) else type(obj)
+        elif isinstance(obj, dict):
+            args = {k: self._compile(v) for k, v in obj.items()}
+            factory = dict
+        else:
+            args = [self._compile(v) for v in obj]
+            factory = type(obj)
+        # End if
+
+        self._steps.append((factory, args, is_component, _substitutions(args)))
+        ref = self._memo[id(obj)] = _Ref(len(self._steps) - 1)
+
+        # Compiled objects are kept so that their ids are not reused during compilation
+        self._compiled.append(obj)
+
+        return ref
+    # End _compile()
+
+    def build(self, row: Sequence) -> FarmZone:
+        """Create a zone with the parameter values in a sample row.
+
+        Parameters
+        ----------
+        * row : Sequence, value for each column, in column order
+
+        Returns
+        ---------
+        * FarmZone : zone ready to run
+        """
+        values = row.tolist() if hasattr(row, 'tolist') else list(row)
+        if len(values) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values. Got: {len(values)}")
+
+        built = []
+        sources = (values, built)
+        for factory, args, as_kwargs, subs in self._steps:
+            if subs:
+                args = args.copy()
+                for k, src, pos in subs:
+                    args[k] = sources[src][pos]
+            # End if
+
+            built.append(factory(**args) if as_kwargs else factory(args))
+        # End for
+
+        return built[-1]
+    # End build()
+
+# End ZoneTemplate()
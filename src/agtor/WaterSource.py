@@ -2,12 +2,13 @@ from typing import Optional
 from dataclasses import dataclass
 
 from agtor.data_interface import generate_params
-from .Component import Component
+from .Component import Component, Versioned, slotted
 from .Pump import Pump
 
 
+@slotted('_version')
 @dataclass
-class WaterSource(Component):
+class WaterSource(Versioned, Component):
     """Source of water for a zone."""
 
     name: str
@@ -1,21 +1,56 @@
 from dataclasses import dataclass
-from typing import Dict, List
-
-from recordclass import recordclass
+from datetime import date
+from calendar import monthrange
+from typing import Dict, List, Optional
 
 from agtor import Component
 from .consts import ML_to_mm
 
 from .Pump import Pump
-from .Field import CropField
+from .Field import CropField, FieldState, FieldParams, update_SWD, required_water
 
 from .Manager import Manager
 from .WaterSource import WaterSource
+from .data_interface import EPOCH_ORDINAL
 
 import numpy as np
 import pandas as pd
 
 
+def _to_ordinal(dt) -> int:
+    """Integer day ordinal of a date. Ordinals are returned as given."""
+    return int(dt) if isinstance(dt, (int, np.integer)) else dt.toordinal()
+# End _to_ordinal()
+
+
+def _months_before(d: date, months: int) -> date:
+    """Same day a number of months earlier, limited to the end of that month."""
+    month_idx = (d.year * 12 + d.month - 1) - months
+    year, month = divmod(month_idx, 12)
+    month += 1
+
+    return date(year, month, min(d.day, monthrange(year, month)[1]))
+# End _months_before()
+
+
+class ZoneWaterSource(object):
+
+    """A water source available to a zone, and its remaining allocation."""
+
+    __slots__ = ('source', 'allocation')
+
+    def __init__(self, source: WaterSource, allocation: float):
+        self.source = source
+        self.allocation = allocation
+    # End __init__()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(source={self.source!r}, allocation={self.allocation!r})"
+    # End __repr__()
+
+# End ZoneWaterSource()
+
+
 @dataclass
 class FarmZone:
     '''Represents a farm zone.
@@ -37,21 +72,27 @@ class FarmZone:
         self._allocation = self.allocation
         self.yearly_timestep = 1
 
-        ws_obj = recordclass('water_source', 'source allocation')
-
         self.water_sources = {
-            ws.name: ws_obj(ws, self.allocation[ws.name])
+            ws.name: ZoneWaterSource(ws, self.allocation[ws.name])
             for ws in self.water_sources
         }
 
         assert len(set([f.name for f in self.fields])) == len(self.fields),\
             "Names of fields have to be unique"
+
+        # Field state is held in contiguous arrays, with each field 
+        # object acting as a view onto its entries.
+        self._field_state = FieldState.from_fields(self.fields)
+        self._climate_cols = (None, None, None)
+
+        # Crop and irrigation attributes of each field (see `_current_field_params()`)
+        self._field_params = None
         
     # End __post_init__()
 
     @property
     def total_area_ha(self):
-        return sum([f.total_area_ha for f in self.fields])
+        return float(self._field_state.total_area_ha.sum())
     # End total_area_ha()
 
     def use_allocation(self, ws_name, value):
@@ -140,12 +181,10 @@ class FarmZone:
         if vol_ML == 0.0:
             return 0.0
         
-        area = 0.0
-        req_water_mm = 0.0
-        for f in self.fields:
-            area += f.total_area_ha if f.irrigated_area is None else f.irrigated_area
-            req_water_mm += f.calc_required_water()
-        # End for
+        state = self._field_state
+        irrig_area = state.irrigated_area
+        area = float(np.where(np.isnan(irrig_area), state.total_area_ha, irrig_area).sum())
+        req_water_mm = float(self.calc_required_water().sum())
 
         if (area == 0.0) or (req_water_mm == 0.0):
             return 0.0
@@ -168,55 +207,311 @@ class FarmZone:
             count = count + 1 if f.harvested else count
         return count == len(self.fields)
 
-    def apply_rainfall(self, dt):
+    @property
+    def all_fields_fallow(self):
+        """True if no field has a current cropping season, otherwise False.
+        """
         for f in self.fields:
-            # get rainfall and et for datetime
-            f_name = f.name
-            rain_col = f'{f_name}_rainfall'
-            et_col = f'{f_name}_ET'
+            if f.harvest_ordinal is not None:
+                return False
+        # End for
 
-            idx = self.climate._data.index == dt
+        return True
+    # End all_fields_fallow()
+
+    def _field_climate_cols(self) -> tuple:
+        """Positions of rainfall and ET columns in climate data for each field."""
+        climate, rain_cols, et_cols = self._climate_cols
+        if climate is not self.climate:
+            cols = [self.climate.field_columns(f.name) for f in self.fields]
+            rain_cols = np.array([c[0] for c in cols], dtype=np.int64)
+            et_cols = np.array([c[1] for c in cols], dtype=np.int64)
+            self._climate_cols = (self.climate, rain_cols, et_cols)
+        # End if
 
-            subset = self.climate[idx][[rain_col, et_col]]
-            # subset = self.climate.loc[dt, [rain_col, et_col]]
-            # rainfall, et = subset[rain_col], subset[et_col]
-            rainfall, et = subset[rain_col][0], subset[et_col][0]
+        return rain_cols, et_cols
+    # End _field_climate_cols()
 
-            f.update_SWD(rainfall, et)
-        # End for
+    def _current_field_params(self) -> FieldParams:
+        """Crop and irrigation attributes of each field, gathered again when changed."""
+        params = self._field_params
+        if (params is None) or not params.is_current(self.fields):
+            params = self._field_params = FieldParams(self.fields)
+
+        return params
+    # End _current_field_params()
+
+    def update_SWD(self, rainfall: np.ndarray, ET: np.ndarray):
+        """Update soil water deficit of all fields.
+
+        Parameters
+        ----------
+        * rainfall : np.ndarray, rainfall across timestep for each field in mm
+        * ET : np.ndarray, evapotranspiration across timestep for each field in mm
+        """
+        update_SWD(self._field_state, rainfall, ET)
+    # End update_SWD()
+
+    def apply_rainfall(self, dt):
+        climate = self.climate
+        idx = climate.time_index(dt)
+        rain_cols, et_cols = self._field_climate_cols()
+
+        # get rainfall and et for datetime
+        row = climate.values[idx]
+        self.update_SWD(row[rain_cols], row[et_cols])
     # End apply_rainfall()
 
+    def advance_rainfall(self, rows):
+        """Apply rainfall and ET across a run of climate rows in bulk.
+
+        Equivalent to calling `apply_rainfall()` for each day, but 
+        intended for stretches of days where no management occurs.
+
+        Parameters
+        ----------
+        * rows : List[int], row positions in climate data, in time order
+        """
+        if len(rows) == 0:
+            return
+
+        rain_cols, et_cols = self._field_climate_cols()
+        values = self.climate.values
+        rainfall = values[np.ix_(rows, rain_cols)]
+        et = values[np.ix_(rows, et_cols)]
+
+        for day_rain, day_et in zip(rainfall, et):
+            self.update_SWD(day_rain, day_et)
+        # End for
+    # End advance_rainfall()
+
+    def calc_required_water(self, dt=None) -> np.ndarray:
+        """Volume of water to maintain moisture at net irrigation depth, for all fields.
+
+        Vectorized equivalent of `CropField.calc_required_water()`.
+        Factors in irrigation efficiency. Values are given in mm.
+
+        Crop and irrigation attributes are gathered when they change, 
+        see `FieldParams`.
+
+        Returns
+        ---------
+        * np.ndarray : required water for each field
+        """
+        t = None if dt is None else _to_ordinal(dt)
+
+        return required_water(self._field_state, self._current_field_params(), t)
+    # End calc_required_water()
+
+    def needs_management(self, dt) -> bool:
+        """Determine whether a management decision can occur for the given day.
+
+        Decisions occur on sowing and harvest days, and on in-season days 
+        where an irrigated field requires water. Should be called after 
+        rainfall has been applied for the day.
+
+        Parameters
+        ----------
+        * dt : datetime or int, date or integer day ordinal
+        """
+        t = _to_ordinal(dt)
+        today = date.fromordinal(t)
+        month_day = (today.month, today.day)
+
+        req_water = None
+        for i, f in enumerate(self.fields):
+            s_end = f.harvest_ordinal
+            if s_end is None:
+                if month_day == f.crop.plant_month_day:
+                    return True
+
+                continue
+            # End if
+
+            s_start = f.sow_ordinal
+            if (t == s_start) or (t == s_end):
+                return True
+
+            if (t > s_start) and (t < s_end) and (f.irrigated_area != 0.0):
+                if req_water is None:
+                    req_water = self.calc_required_water(t)
+
+                if req_water[i] > 0.0:
+                    return True
+            # End if
+        # End for
+
+        return False
+    # End needs_management()
+
+    def freeze(self):
+        """Freeze all fields and water sources in the zone.
+
+        See `Component.freeze()`.
+        """
+        for f in self.fields:
+            f.freeze()
+
+        for w in self.water_sources.values():
+            w.source.freeze()
+        # End for
+
+        return self
+    # End freeze()
+
+    def run(self, farmer: Manager, time_steps=None, event_driven: bool = True,
+            on_date: Optional[Dict] = None) -> List[Dict]:
+        """Run the zone across a sequence of time steps.
+
+        In event-driven mode the farm manager is only consulted on days 
+        where a decision can change: sowing and harvest days, and 
+        in-season days where an irrigated field requires water. 
+        While all fields lie fallow, soil water deficit is advanced in 
+        bulk up to the next sowing day. Results match those of calling 
+        `run_timestep()` for every day.
+
+        Components are frozen before the run (see `freeze()`).
+
+        Parameters
+        ----------
+        * farmer : Manager
+        * time_steps : DatetimeIndex, consecutive days to run. 
+                       Defaults to all time steps in the climate data.
+        * event_driven : bool, skip days where no management decision occurs
+        * on_date : Dict[Tuple[int, int], Callable], functions to call with 
+                    (zone, datetime) on a given (month, day), before the 
+                    time step is run, e.g. to reset allocations each season.
+
+        Days are tracked internally as integer day ordinals, with 
+        Timestamps only given to `on_date` functions and in results.
+
+        Returns
+        ---------
+        * List[Dict] : results for each time step where harvests occurred
+        """
+        if time_steps is None:
+            time_steps = self.climate.time_steps
+        
+        on_date = {} if on_date is None else on_date
+
+        self.freeze()
+
+        climate = self.climate
+        days = time_steps.values.astype('datetime64[D]').astype(np.int64)
+        ordinals = (days + EPOCH_ORDINAL).tolist()
+        rows = np.array([climate.time_index(t) for t in ordinals], dtype=np.int64)
+        month_day = (time_steps.month.values * 100) + time_steps.day.values
+        md_list = month_day.tolist()
+        on_md = {m * 100 + d: func for (m, d), func in on_date.items()}
+        positions = {}
+
+        def next_position(md, k):
+            """Position of the next day at or after `k` with the given month-day."""
+            if md not in positions:
+                positions[md] = np.flatnonzero(month_day == md)
+
+            pos = positions[md]
+            i = np.searchsorted(pos, k)
+
+            return pos[i] if i < len(pos) else len(time_steps)
+        # End next_position()
+
+        results = []
+        num_steps = len(time_steps)
+        k = 0
+        while k < num_steps:
+            t = ordinals[k]
+
+            func = on_md.get(md_list[k])
+            if func is not None:
+                func(self, time_steps[k])
+
+            if not event_driven:
+                res = self.run_timestep(farmer, t)
+                if res is not None:
+                    results.append(res)
+
+                k += 1
+                continue
+            # End if
+
+            if self.all_fields_fallow:
+                # Next sowing day, or next day with a user-specified action
+                next_event = min([next_position(f.crop.plant_month_day[0] * 100 
+                                                + f.crop.plant_month_day[1], k) 
+                                  for f in self.fields] +
+                                 [next_position(md, k+1) for md in on_md])
+
+                if next_event > k:
+                    self.advance_rainfall(rows[k:next_event])
+                    k = next_event
+                    continue
+                # End if
+            # End if
+
+            self.apply_rainfall(t)
+            if self.needs_management(t):
+                res = self.manage(farmer, t)
+                if res is not None:
+                    results.append(res)
+            # End if
+
+            k += 1
+        # End while
+
+        return results
+    # End run()
+
     def run_timestep(self, farmer: Manager, dt: object):
-        seasonal_ts = self.yearly_timestep
         self.apply_rainfall(dt)
 
+        return self.manage(farmer, dt)
+    # End run_timestep()
+
+    def manage(self, farmer: Manager, dt: object, irrigation: Optional[tuple] = None):
+        """Apply farm management decisions for a time step.
+
+        Rainfall for the time step is expected to have been applied.
+
+        Parameters
+        ----------
+        * farmer : Manager
+        * dt : datetime or int, date or integer day ordinal of the time step
+        * irrigation : tuple, result of `farmer.optimize_irrigation()` for 
+                       the time step, if already known
+        """
+        seasonal_ts = self.yearly_timestep
+
+        t = _to_ordinal(dt)
+        today = date.fromordinal(t)
+        month_day = (today.month, today.day)
+
         opt_cache = {}
         zone = self
-        irrigation, cost_per_ML = farmer.optimize_irrigation(zone, dt)
+        if irrigation is None:
+            irrigation = farmer.optimize_irrigation(zone, t)
+
+        irrigation, cost_per_ML = irrigation
+        req_water = None
         results = {}
-        for f in self.fields:
-            s_start = f.plant_date
-            s_end = None
-            try:
-                s_end = f.harvest_date
-            except AttributeError:
-                is_sow_day = (dt.month == s_start.month) and (dt.day == s_start.day)
-                if is_sow_day:
-                    s_start = s_start.replace(year=dt.year)
-                    f.harvest_date = s_start + f.crop.harvest_offset
-                    s_end = f.harvest_date
-                # End if
-            # End try
+        for i, f in enumerate(self.fields):
+            s_start = f.sow_ordinal
+            s_end = f.harvest_ordinal
+            if s_end is None:
+                if month_day != f.crop.plant_month_day:
+                    continue
 
-            if not s_end:
-                continue
+                # Sowing day, schedule harvest for the season
+                s_start = t
+                s_end = f.harvest_ordinal = t + f.crop.harvest_days
+            # End if
 
-            in_season = (dt >= s_start) and (dt <= s_end)
+            in_season = (t >= s_start) and (t <= s_end)
             if not in_season:
                 continue
 
             crop = f.crop
-            if (dt > s_start) and (dt < s_end):
+            if (t > s_start) and (t < s_end):
                 # in season
                 if f.irrigated_area == 0.0:
                     # no irrigation occurred!
@@ -230,7 +525,12 @@ class FarmZone:
 
                 split = farmer.perc_irrigation_sources(f, self.water_sources, irrigation)
 
-                water_to_apply_mm = f.calc_required_water(dt)
+                if req_water is None:
+                    # Water requirements do not depend on irrigation 
+                    # applied to other fields, so get for all fields at once
+                    req_water = self.calc_required_water(t).tolist()
+
+                water_to_apply_mm = req_water[i]
                 for ws_name in self.water_sources:
                     ws_proportion = split[ws_name]
                     if ws_proportion == 0.0:
@@ -247,10 +547,10 @@ class FarmZone:
 
                     self.apply_irrigation(f, ws_name, mm_vol_to_apply)
 
-                    tmp = sum([v for k, v in cost_per_ML.items() if (f.name in k) and (ws_name in k)])
-                    f.log_irrigation_cost(tmp * (mm_vol_to_apply / ML_to_mm) * f.irrigated_area)
+                    ML_cost = cost_per_ML.value(f.name, ws_name)
+                    f.log_irrigation_cost(ML_cost * (mm_vol_to_apply / ML_to_mm) * f.irrigated_area)
                 # End for
-            elif dt == s_start:
+            elif t == s_start:
                 # cropping for this field begins
                 # print("Cropping started:", f.name, dt.year, "\n")
                 if zone.name in opt_cache:
@@ -260,22 +560,22 @@ class FarmZone:
                     opt_cache[zone.name] = opt_field_area
 
                 f.irrigated_area = farmer.get_optimum_irrigated_area(f, opt_field_area)
-                f.plant_date = s_start
+                f.sow_ordinal = s_start
                 f.sowed = True
-                crop.update_stages(dt)
+                crop.update_stages(today)
 
                 self.opt_field_area = opt_field_area
-            elif (dt == s_end) and f.sowed:
+            elif (t == s_end) and f.sowed:
                 # end of season
 
-                income = self.net_income(dt, farmer, f)
+                income = self.net_income(today, farmer, f)
 
                 # print(f.name, "harvested! -", dt.year)
                 # print("Est. Total Income:", income)
                 # print("------------------\n")
 
                 results[f.name] = {
-                    'datetime': dt,
+                    'datetime': pd.Timestamp(today),
                     'income': income,
                     'irrigated_area': f.irrigated_area
                 }
@@ -286,20 +586,28 @@ class FarmZone:
 
         if results:
             return results
-    # End run_timestep()
+    # End manage()
 
     def net_income(self, dt, farmer, field):
         f = field
+        if isinstance(dt, (int, np.integer)):
+            dt = date.fromordinal(dt)
+
+        sow, harvest = f.sow_ordinal, f.harvest_ordinal
+
+        # Rainfall column of this field only, see `Climate.field_columns()`
+        climate = self.climate
+        rain_col = climate.columns[climate.field_columns(f.name)[0]]
 
         # growing season rainfall
-        gsr_mm = self.climate.get_seasonal_rainfall([f.plant_date, f.harvest_date], f.name)
+        gsr_mm = climate.range_sum(sow, harvest, rain_col)
         irrig_mm = f.irrigated_vol_mm
 
         # The French-Schultz method assumes 30% of previous season's
         # rainfall contributed towards crop growth
-        prev = f.plant_date - pd.DateOffset(months=3)
+        prev = _months_before(date.fromordinal(sow), 3).toordinal()
         fs_ssm_assumption = 0.3
-        ssm_mm = self.climate.get_seasonal_rainfall([prev, f.plant_date], f.name) * fs_ssm_assumption
+        ssm_mm = climate.range_sum(prev, sow, rain_col) * fs_ssm_assumption
 
         crop_yield_calc = farmer.calc_potential_crop_yield
         income = f.gross_income(crop_yield_calc, 
@@ -9,9 +9,15 @@ from .Crop import *
 from .Irrigation import *
 from .Pump import *
 from .Field import *
+from .Solver import *
 from .Manager import *
 from .Climate import *
 from .WaterSource import *
+from .Batch import *
+from .Template import *
+from .Registry import *
+from .Catchment import *
+from .Ensemble import *
 
 
 try:
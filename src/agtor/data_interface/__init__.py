@@ -1,2 +1,3 @@
 from .file_loader import *
-from .properties import *
\ No newline at end of file
+from .properties import *
+from .bundle import *
\ No newline at end of file
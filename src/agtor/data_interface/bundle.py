@@ -0,0 +1,196 @@
+from typing import Dict, Iterable, Optional
+import os
+import json
+import struct
+import pickle
+
+from .file_loader import load_yaml
+
+
+# Identifies scenario bundle files, followed by the format version
+BUNDLE_MAGIC = b'AGTORSPC'
+BUNDLE_VERSION = 1
+
+# Magic, format version and size of the index in bytes
+_HEADER = struct.Struct('<8sIQ')
+
+
+def write_bundle(path: str, specs: Dict[str, Dict[str, Dict]]):
+    """Write component specifications of a scenario to a single bundle file.
+
+    The layout consists of:
+
+    * a fixed-size header
+    * a JSON index giving the position and size of each specification,
+      by component type and name
+    * each specification, pickled separately so that it can be loaded
+      on its own
+
+    Bundle files hold pickled data, so should only be read from trusted sources.
+
+    Parameters
+    ----------
+    * path : str, file to write to
+    * specs : Dict[str, Dict[str, Dict]], specifications by component type,
+              then by name, e.g. as given by `load_specs()`
+    """
+    index = {}
+    blobs = []
+    offset = 0
+    for kind, named in specs.items():
+        index[kind] = {}
+        for name, spec in named.items():
+            blob = pickle.dumps(spec, protocol=4)
+            index[kind][name] = [offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+        # End for
+    # End for
+
+    index = json.dumps(index, separators=(',', ':')).encode('utf-8')
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as fp:
+        fp.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index)))
+        fp.write(index)
+        for blob in blobs:
+            fp.write(blob)
+    # End with
+    os.replace(tmp, path)
+# End write_bundle()
+
+
+def bundle_spec_dirs(spec_dirs: Dict[str, str], path: str, ext: str = '.yml'):
+    """Convert directories of specification files into a single bundle file.
+
+    Parameters
+    ----------
+    * spec_dirs : Dict[str, str], directory of specifications for each
+                  component type, e.g. `{'crops': 'data/crops/'}`
+    * path : str, bundle file to write to
+    * ext : str, file extension of specification files
+    """
+    write_bundle(path, {k: load_yaml(d, ext=ext) for k, d in spec_dirs.items()})
+# End bundle_spec_dirs()
+
+
+class SpecBundle(object):
+
+    """Read access to a scenario bundle written by `write_bundle()`.
+
+    Only the index is read on opening. Specifications are read when
+    requested, so a zone referencing a few components of a large
+    scenario reads only those. A new copy is given on each request,
+    as creating components replaces values in specifications.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+        * path : str, bundle file
+        """
+        self.path = path
+        self._fp = open(path, 'rb')
+        try:
+            header = self._fp.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"Not a scenario bundle: {path}")
+
+            magic, version, index_size = _HEADER.unpack(header)
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"Not a scenario bundle: {path}")
+
+            if version != BUNDLE_VERSION:
+                raise ValueError(f"Unsupported bundle version {version} in {path}")
+
+            self.index = json.loads(self._fp.read(index_size).decode('utf-8'))
+            self._data_start = _HEADER.size + index_size
+        except Exception:
+            self._fp.close()
+            raise
+        # End try
+    # End __init__()
+
+    def __reduce__(self):
+        # Open handles cannot be sent to other processes, the bundle is reopened instead
+        return (self.__class__, (self.path, ))
+    # End __reduce__()
+
+    def __enter__(self):
+        return self
+    # End __enter__()
+
+    def __exit__(self, *args):
+        self.close()
+    # End __exit__()
+
+    def close(self):
+        self._fp.close()
+    # End close()
+
+    @property
+    def component_types(self) -> list:
+        return list(self.index)
+    # End component_types()
+
+    def names(self, kind: str) -> list:
+        """Names of all specifications of a component type."""
+        return list(self.index[kind])
+    # End names()
+
+    def get(self, kind: str, name: str) -> Dict:
+        """Read a single specification.
+
+        Parameters
+        ----------
+        * kind : str, component type, e.g. 'crops'
+        * name : str, name of the specification
+        """
+        try:
+            offset, size = self.index[kind][name]
+        except KeyError:
+            raise KeyError(f"No '{kind}' specification named '{name}' in {self.path}")
+
+        self._fp.seek(self._data_start + offset)
+
+        return pickle.loads(self._fp.read(size))
+    # End get()
+
+    def load(self, kind: str, names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Read specifications of a component type, matching `load_yaml()`.
+
+        Parameters
+        ----------
+        * kind : str, component type
+        * names : Iterable[str], specifications to read. Reads all if None.
+
+        Returns
+        ---------
+        * Dict[str, Dict] : specifications by name
+        """
+        if names is None:
+            names = self.index[kind]
+
+        return {n: self.get(kind, n) for n in names}
+    # End load()
+
+    def select(self, components: Optional[Dict[str, Iterable[str]]] = None) -> Dict[str, Dict]:
+        """Read the specifications referenced by a zone, matching `load_specs()`.
+
+        Parameters
+        ----------
+        * components : Dict[str, Iterable[str]], names of specifications to
+                       read by component type. Reads all if None.
+
+        Returns
+        ---------
+        * Dict[str, Dict] : specifications by component type, then by name
+        """
+        if components is None:
+            components = {k: None for k in self.index}
+
+        return {k: self.load(k, names) for k, names in components.items()}
+    # End select()
+
+# End SpecBundle()
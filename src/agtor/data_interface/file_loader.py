@@ -2,36 +2,212 @@ from pebble import ProcessPool
 from multiprocessing import cpu_count
 
 from glob import glob
+import os
+import json
+import pickle
+import hashlib
+
+import numpy as np
+import pandas as pd
 import yaml
 
+# Offset between proleptic Gregorian day ordinals and days since 1970-01-01
+EPOCH_ORDINAL = 719163
+
+
+# Prefer the libyaml-based C loader where available
+YAMLLoader = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+
+# Parse files across processes only when there are enough to offset process start-up
+PARALLEL_MIN_FILES = 200
+
 
 def ingest_data(fn):
     with open(fn) as fp:
-        loaded = yaml.load(fp, Loader=yaml.FullLoader)
+        loaded = yaml.load(fp, Loader=YAMLLoader)
     return loaded
 # End ingest_data()
 
 
-def load_yaml(data_dir, ext='.yml', cpus=None):
+def _ingest_files(fns):
+    return [ingest_data(fn) for fn in fns]
+# End _ingest_files()
+
+
+def _file_key(fn) -> tuple:
+    """Modification time and size of a file, identifying its version."""
+    stat = os.stat(fn)
+    return (stat.st_mtime_ns, stat.st_size)
+# End _file_key()
+
+
+def _cache_path(cache_dir, data_dir, ext) -> str:
+    """Location of the parsed-spec cache for a directory of specifications."""
+    digest = hashlib.sha1(f"{os.path.abspath(data_dir)}|{ext}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"specs_{digest}.pkl")
+# End _cache_path()
+
+
+def _read_cache(fn) -> dict:
+    try:
+        with open(fn, 'rb') as fp:
+            return pickle.load(fp)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+# End _read_cache()
+
+
+def _write_cache(fn, cached: dict):
+    """Write cache atomically, so concurrent readers see a complete cache."""
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    tmp = f"{fn}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as fp:
+        pickle.dump(cached, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, fn)
+# End _write_cache()
+
+
+def load_yaml(data_dir, ext='.yml', cpus=None, cache_dir=None):
+    """Load all specifications in a directory.
+
+    Files are parsed across processes when there are many of them 
+    (see `PARALLEL_MIN_FILES`).
+
+    Parameters
+    ----------
+    * data_dir : str, directory of specification files
+    * ext : str, file extension of specification files
+    * cpus : int, number of processes used to parse files. 
+             Uses all CPUs if None.
+    * cache_dir : str, directory to cache parsed specifications in.
+                  Files are only parsed again once modified (by modification 
+                  time and size). No caching if None.
+
+    Returns
+    ---------
+    * Dict[str, Dict] : specifications by name
+    """
     if not ext.startswith('.'):
         raise ValueError("Extension must include period, e.g. '.yml'")
 
-    if not data_dir.endswith("/") or not data_dir.endswith("\\"):
-        data_dir += '/'
-    
     if not cpus:
         cpus = cpu_count()
 
-    data_files = glob(data_dir+"*{}".format(ext))
+    data_files = sorted(glob(os.path.join(data_dir, "*{}".format(ext))))
+    keys = {fn: _file_key(fn) for fn in data_files}
+
+    cache_fn = None
+    cached = {}
+    if cache_dir is not None:
+        cache_fn = _cache_path(cache_dir, data_dir, ext)
+        cached = _read_cache(cache_fn)
+
+    parsed = {fn: cached[fn][1] for fn in data_files 
+              if fn in cached and cached[fn][0] == keys[fn]}
+    pending = [fn for fn in data_files if fn not in parsed]
+
+    if cpus > 1 and len(pending) >= PARALLEL_MIN_FILES:
+        chunksize = -(-len(pending) // (cpus * 4))
+        chunks = [pending[i:i+chunksize] for i in range(0, len(pending), chunksize)]
+        with ProcessPool(max_workers=cpus) as pool:
+            collated = pool.map(_ingest_files, chunks)
+            for fns, data in zip(chunks, collated.result()):
+                parsed.update(zip(fns, data))
+        # End with
+    else:
+        parsed.update((fn, ingest_data(fn)) for fn in pending)
+    # End if
+
+    if cache_fn is not None and (pending or len(cached) != len(data_files)):
+        _write_cache(cache_fn, {fn: (keys[fn], parsed[fn]) for fn in data_files})
 
     loaded_dataset = {}
     for fn in data_files:
-        data = ingest_data(fn)
+        data = parsed[fn]
         loaded_dataset[data['name']] = data
 
-    # with ProcessPool(max_workers=cpus) as pool:
-    #     collated = pool.map(ingest_data, data_files, timeout=30)
-    #     loaded_dataset = {fn['name']: fn for fn in collated.result()}
-
     return loaded_dataset
-# End load_yaml()
\ No newline at end of file
+# End load_yaml()
+
+def write_climate_binary(path: str, values: np.ndarray, ordinals: np.ndarray, 
+                         columns: list, index_name=None):
+    """Write climate data to a binary directory layout that can be memory-mapped.
+
+    The layout consists of:
+
+    * `values.npy` : 2D array of climate values (time x variable)
+    * `ordinals.npy` : integer day ordinal of each row
+    * `meta.json` : column names and other metadata
+
+    Parameters
+    ----------
+    * path : str, directory to write to (created if it does not exist)
+    * values : np.ndarray, 2D climate data
+    * ordinals : np.ndarray, day ordinal for each row in `values`
+    * columns : List[str], column names
+    * index_name : str, name of the date index, if any
+    """
+    if len(ordinals) != values.shape[0] or len(columns) != values.shape[1]:
+        raise ValueError("Shape of climate values does not match dates and/or columns")
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'values.npy'), np.ascontiguousarray(values))
+    np.save(os.path.join(path, 'ordinals.npy'), np.asarray(ordinals, dtype=np.int64))
+
+    meta = {
+        'columns': list(columns),
+        'index_name': index_name,
+        'dtype': str(values.dtype),
+        'shape': list(values.shape)
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as fp:
+        json.dump(meta, fp)
+# End write_climate_binary()
+
+
+def read_climate_binary(path: str, mmap_mode='r') -> tuple:
+    """Read climate data written by `write_climate_binary()`.
+
+    Parameters
+    ----------
+    * path : str, directory holding climate data
+    * mmap_mode : str or None, memory-map mode passed to `np.load()`.
+                  Use None to load data into memory.
+
+    Returns
+    ---------
+    * tuple : (values, ordinals, metadata)
+    """
+    with open(os.path.join(path, 'meta.json')) as fp:
+        meta = json.load(fp)
+
+    values = np.load(os.path.join(path, 'values.npy'), mmap_mode=mmap_mode)
+    ordinals = np.load(os.path.join(path, 'ordinals.npy'))
+
+    return values, ordinals, meta
+# End read_climate_binary()
+
+
+def convert_climate_csv(csv_fn: str, path: str, dtype=np.float64, **kwargs):
+    """One-time conversion of climate CSV to a memory-mappable binary layout.
+
+    Data can then be loaded with `Climate.from_mmap(path)`.
+
+    Parameters
+    ----------
+    * csv_fn : str, path to climate CSV, with dates in the first column
+    * path : str, directory to write binary data to
+    * dtype : numpy dtype, storage type of climate values
+    * kwargs : additional arguments passed to `pd.read_csv()`.
+               Defaults to parsing dates given day first.
+    """
+    opts = dict(index_col=0, parse_dates=True, dayfirst=True)
+    opts.update(kwargs)
+    data = pd.read_csv(csv_fn, **opts)
+
+    dates = data.index.values.astype('datetime64[D]')
+    ordinals = dates.astype(np.int64) + EPOCH_ORDINAL
+
+    write_climate_binary(path, data.to_numpy(dtype=dtype), ordinals, 
+                         list(data.columns), data.index.name)
+# End convert_climate_csv()
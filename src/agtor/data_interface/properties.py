@@ -9,9 +9,13 @@ from ema_workbench import RealParameter, Constant, CategoricalParameter
 ema_mod = __import__('ema_workbench')
 
 
-def generate_params(prefix: str, dataset: Dict, override: Optional[Dict]=None):
+def generate_params(prefix: str, dataset: Dict, override: Optional[Dict]=None,
+                    _legacy_prefix: Optional[str]=None):
     """Generate EMA Workbench compatible parameter definitions.
 
+    Ids of nested values include the names of the dicts holding them,
+    e.g. `Crop___wheat__growth_stages__initial__stage_length`.
+
     Parameters
     ----------
     prefix : str
@@ -31,8 +35,20 @@ def generate_params(prefix: str, dataset: Dict, override: Optional[Dict]=None):
         var_id = prefix+n
 
         if isinstance(vals, dict):
-            dataset[n] = generate_params(prefix, vals, override)
+            # Ids of nested values previously left out the names of the
+            # dicts holding them, so were not unique (e.g. across growth stages)
+            legacy = prefix if _legacy_prefix is None else _legacy_prefix + '__'
+            dataset[n] = generate_params(var_id, vals, override, _legacy_prefix=legacy)
             continue
+
+        if (_legacy_prefix is not None) and (var_id not in override):
+            legacy_id = f"{_legacy_prefix}__{n}"
+            if legacy_id in override:
+                warnings.warn(f"Override '{legacy_id}' uses a deprecated parameter id, "
+                              f"use '{var_id}' instead.", DeprecationWarning)
+                override[var_id] = override.pop(legacy_id)
+            # End if
+        # End if
         
         # Replace nominal value with override value if specified
         if var_id in override:
@@ -103,6 +119,9 @@ def sort_param_types(element, unc, cats, consts):
         return unc, cats, consts
 
     for el in element.values():
+        # Parameters held in a registry are sorted by their definition
+        el = getattr(el, 'definition', el)
+
         if isinstance(el, dict):
             unc, cats, consts = sort_param_types(el, unc, cats, consts)
         elif isinstance(el, Constant):
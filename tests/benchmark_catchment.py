@@ -0,0 +1,66 @@
+"""Scaling benchmark for running the zones of a catchment across worker processes.
+
+Runs a catchment of identical zones with 1 to N worker processes, with
+and without a per-timestep barrier (coupling), and reports run times and
+speed-up relative to a single process.
+
+Usage, from the repository root:
+
+    python tests/benchmark_catchment.py [num_zones] [max_cpus] [num_years]
+"""
+import sys
+from multiprocessing import cpu_count
+from timeit import default_timer as timer
+
+from agtor import Catchment, Manager, ZoneCoupling
+
+from test_run import setup_zone, reset_allocation
+
+
+def setup_catchment(num_zones: int, climate) -> Catchment:
+    zones = []
+    for i in range(num_zones):
+        z, _ = setup_zone(climate)
+        z.name = f"Zone_{i}"
+        zones.append(z)
+    # End for
+
+    return Catchment(zones, {z.name: Manager() for z in zones})
+# End setup_catchment()
+
+
+def run_benchmark(num_zones: int, max_cpus: int, num_years: int):
+    climate = setup_zone()[0].climate
+    time_steps = climate.time_steps[0:(365*num_years)]
+
+    cpus = 1
+    cpu_counts = []
+    while cpus < max_cpus:
+        cpu_counts.append(cpus)
+        cpus *= 2
+    # End while
+    cpu_counts.append(max_cpus)
+
+    print(f"{num_zones} zones, {len(time_steps)} days")
+    for label, coupling in (('independent', None), ('coupled', ZoneCoupling())):
+        base = None
+        for cpus in cpu_counts:
+            catchment = setup_catchment(num_zones, climate)
+
+            start = timer()
+            catchment.run(time_steps, cpus=cpus, coupling=coupling,
+                          on_date={(5, 15): reset_allocation})
+            elapsed = timer() - start
+
+            base = elapsed if base is None else base
+            print(f"{label:>12} | cpus: {cpus:>3} | {elapsed:8.2f}s | speed-up: {base / elapsed:5.2f}x")
+        # End for
+    # End for
+# End run_benchmark()
+
+
+if __name__ == '__main__':
+    args = [int(v) for v in sys.argv[1:]]
+    num_zones, max_cpus, num_years = args + [32, cpu_count(), 5][len(args):]
+
+    run_benchmark(num_zones, max_cpus, num_years)
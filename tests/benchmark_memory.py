@@ -0,0 +1,70 @@
+"""Memory used per field and per zone, measured with tracemalloc.
+
+Creates one zone holding many fields (sharing an irrigation system
+and crop rotation), then many single-field zones, and reports the
+memory allocated for each field and zone. Climate data and shared
+components are created beforehand, so are not counted.
+
+Usage, from the repository root:
+
+    python tests/benchmark_memory.py [num_fields] [num_zones]
+"""
+import sys
+import tracemalloc
+
+from agtor import CropField, FarmZone
+
+from test_run import setup_zone
+
+
+def measure(create) -> int:
+    """Bytes allocated and still held after calling `create()`."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    created = create()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Keep created objects alive until measured
+    del created
+
+    return after - before
+# End measure()
+
+
+def run_benchmark(num_fields: int, num_zones: int):
+    template, w_specs = setup_zone()
+    climate = template.climate
+    irrig = template.fields[0].irrigation
+    crop_rotation = template.fields[0].crop_rotation
+    allocation = {'surface_water': 225.0, 'groundwater': 50.0}
+
+    def create_field(i):
+        return CropField(f'field{i}', 100.0, irrig, crop_rotation, 100.0, 20.0, 100.0)
+    # End create_field()
+
+    def large_zone():
+        fields = [create_field(i) for i in range(num_fields)]
+        return FarmZone('Zone_1', climate=climate, fields=fields,
+                        water_sources=w_specs, allocation=allocation)
+    # End large_zone()
+
+    def single_field_zones():
+        return [FarmZone(f'Zone_{i}', climate=climate, fields=[create_field(i)],
+                         water_sources=w_specs, allocation=allocation)
+                for i in range(num_zones)]
+    # End single_field_zones()
+
+    per_field = measure(large_zone) / num_fields
+    per_zone = measure(single_field_zones) / num_zones
+
+    print(f"{num_fields} fields in a zone    | {per_field:8.0f} bytes per field")
+    print(f"{num_zones} single-field zones | {per_zone / 1024:8.2f} KB per zone")
+# End run_benchmark()
+
+
+if __name__ == '__main__':
+    args = [int(v) for v in sys.argv[1:]]
+    num_fields, num_zones = args + [20000, 2000][len(args):]
+
+    run_benchmark(num_fields, num_zones)
@@ -1,10 +1,11 @@
 # import pytest
+import numpy as np
 import pandas as pd
 import yaml
 import pytest
 
 from agtor import Crop
-from agtor.data_interface import load_yaml, get_samples
+from agtor.data_interface import load_yaml, get_samples, bundle_spec_dirs, SpecBundle
 from agtor import Climate
 # load_crop_data, create_crop, collate_crop_data
 
@@ -29,6 +30,299 @@ def test_loading_climate():
     climate = Climate(data)
 
 
+def test_climate_time_index():
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data)
+
+    dt = climate.time_steps[400]
+    idx = climate.time_index(dt)
+    assert idx == 400
+    assert climate.time_index(dt.toordinal()) == idx
+
+    rainfall, et = climate.get_rainfall_et(idx, 'field1')
+    assert rainfall == data.loc[dt, 'field1_rainfall']
+    assert et == data.loc[dt, 'field1_ET']
+
+
+def test_climate_range_sum():
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data)
+
+    start, end = pd.to_datetime('1981-05-15'), pd.to_datetime('1981-10-13')
+    expected = data.loc[start:end, 'field2_rainfall'].sum()
+    gsr = climate.get_seasonal_rainfall([start, end], 'field2')
+    assert np.isclose(gsr, expected)
+
+    expected = data.loc[start:end, 'field2_ET'].sum()
+    assert np.isclose(climate.get_seasonal_et([start, end], 'field2'), expected)
+
+    # Field names are matched exactly, not as substrings of other fields
+    similar = data.assign(field10_rainfall=data['field1_rainfall'] * 100.0,
+                          field10_ET=data['field1_ET'] * 100.0)
+    similar = Climate(similar)
+    expected = data.loc[start:end, 'field1_rainfall'].sum()
+    assert np.isclose(similar.get_seasonal_rainfall([start, end], 'field1'), expected)
+    expected = data.loc[start:end, 'field1_ET'].sum()
+    assert np.isclose(similar.get_seasonal_et([start, end], 'field1'), expected)
+    assert np.isclose(similar.annual_rainfall(1985, 'field1'), 
+                      climate.annual_rainfall(1985, 'field1'))
+
+    # Other identifiers total all matching columns
+    expected = data.loc[start:end, ['field1_rainfall', 'field2_rainfall']].sum().sum()
+    assert np.isclose(climate.get_seasonal_rainfall([start, end], 'field'), expected)
+    expected = data.loc[start:end, ['field1_ET', 'field2_ET']].sum().sum()
+    assert np.isclose(climate.get_seasonal_et([start, end], 'field'), expected)
+
+    # Ranges starting before the record only count available data
+    early = pd.to_datetime('1970-01-01')
+    expected = data.loc[:end, 'field1_rainfall'].sum()
+    assert np.isclose(climate.range_sum(early, end, 'field1_rainfall'), expected)
+
+
+def test_climate_store():
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data, dtype=np.float32)
+
+    assert climate.values.dtype == np.float32
+    assert climate.values.shape == data.shape
+
+    # Column access and DataFrame view do not copy the underlying store
+    rain = climate['field1_rainfall']
+    assert np.shares_memory(rain, climate.values)
+    assert np.shares_memory(climate._data.to_numpy(), climate.values)
+    assert np.allclose(rain, data['field1_rainfall'])
+
+    rain_col, et_col = climate.field_columns('field2')
+    assert climate.columns[rain_col] == 'field2_rainfall'
+    assert climate.columns[et_col] == 'field2_ET'
+
+
+def test_climate_pickle():
+    import pickle
+
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data, name='farm')
+
+    # Populate derived lookups and statistics, which are not pickled
+    climate._data
+    climate.description
+    climate.get_seasonal_rainfall(['1981-05-15', '1981-10-13'], 'field1')
+
+    pickled = pickle.dumps(climate)
+    assert len(pickled) < climate.values.nbytes * 1.05
+
+    restored = pickle.loads(pickled)
+    assert restored.name == 'farm'
+    assert np.array_equal(restored.values, climate.values)
+    assert restored.time_steps.equals(climate.time_steps)
+    assert np.shares_memory(restored._data.to_numpy(), restored.values)
+    assert restored.time_index(climate.time_steps[400]) == 400
+    assert restored.get_seasonal_rainfall(['1981-05-15', '1981-10-13'], 'field1') == \
+        climate.get_seasonal_rainfall(['1981-05-15', '1981-10-13'], 'field1')
+
+    # Dates need not be consecutive
+    sparse = Climate(data.iloc[::2])
+    restored = pickle.loads(pickle.dumps(sparse))
+    assert restored.time_steps.equals(sparse.time_steps)
+
+
+def test_climate_annual_stats():
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data)
+
+    # Statistics are only computed when first requested
+    assert 'annual_totals' not in climate.__dict__
+
+    climate_year = data.groupby(by=data.index.year).sum()
+    assert np.isclose(climate.annual_rainfall(1985, 'field1'), 
+                      climate_year.loc[1985, 'field1_rainfall'])
+    assert np.isclose(climate.annual_rainfall(pd.to_datetime('1990-06-01')), 
+                      climate_year.loc[1990, ['field1_rainfall', 'field2_rainfall']].sum())
+
+    assert np.allclose(climate.description.loc['mean', :], climate_year.mean())
+    assert np.allclose(climate.description.loc['90%', :], climate_year.quantile(q=0.9))
+
+
+def test_climate_mmap(tmp_path):
+    from agtor.data_interface import convert_climate_csv
+
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data)
+
+    out_dir = str(tmp_path / 'climate')
+    convert_climate_csv(tgt, out_dir)
+    mapped = Climate.from_mmap(out_dir)
+
+    assert isinstance(mapped.values, np.memmap)
+    assert mapped.columns == climate.columns
+    assert (mapped.time_steps == climate.time_steps).all()
+    assert np.array_equal(mapped.values, climate.values)
+
+    dt = climate.time_steps[100]
+    assert mapped.get_rainfall_et(mapped.time_index(dt), 'field1') == \
+        climate.get_rainfall_et(climate.time_index(dt), 'field1')
+
+    # Round trip from an existing Climate object
+    out_dir = str(tmp_path / 'climate_copy')
+    mapped.to_binary(out_dir)
+    assert np.array_equal(Climate.from_mmap(out_dir).values, climate.values)
+
+
+def _column_total(climate, name):
+    return float(climate[name].sum()), climate.values.flags.writeable
+# End _column_total()
+
+
+def test_climate_shared_memory(tmp_path):
+    import pickle
+    from pebble import ProcessPool
+
+    climate_dir = f"{data_dir}climate/"
+    tgt = climate_dir + 'farm_climate_data.csv'
+    data = pd.read_csv(tgt, index_col=0, parse_dates=True, 
+                       dayfirst=True)
+    climate = Climate(data, source='test')
+    assert climate.handle is None
+
+    shared = climate.to_shared_memory()
+    try:
+        assert shared.source == 'test'
+        assert np.array_equal(shared.values, climate.values)
+        assert not shared.values.flags.writeable
+
+        # Only a handle to the shared data is pickled
+        pickled = pickle.dumps(shared)
+        assert len(pickled) < climate.values.nbytes / 10
+        assert pickle.loads(pickled) is shared
+
+        attached = Climate.attach(shared.handle)
+        assert np.array_equal(attached.values, climate.values)
+        assert (attached.time_steps == climate.time_steps).all()
+        assert attached.get_seasonal_rainfall(['1981-05-15', '1981-10-13'], 'field1') == \
+            climate.get_seasonal_rainfall(['1981-05-15', '1981-10-13'], 'field1')
+        attached.release()
+
+        # Worker processes attach to the same memory
+        with ProcessPool(max_workers=1) as pool:
+            total, writeable = pool.schedule(_column_total, args=(shared, 'field1_rainfall')).result()
+        assert total == float(data['field1_rainfall'].sum())
+        assert not writeable
+    finally:
+        shared.release()
+    # End try
+
+    # Memory-mapped climate data is sent as a path
+    out_dir = str(tmp_path / 'climate')
+    climate.to_binary(out_dir)
+    mapped = Climate.from_mmap(out_dir)
+    assert mapped.handle.location == out_dir
+    pickled = pickle.dumps(mapped)
+    assert len(pickled) < climate.values.nbytes / 10
+    assert np.array_equal(pickle.loads(pickled).values, climate.values)
+# End test_climate_shared_memory()
+
+
+def test_spec_loading_parallel(monkeypatch):
+    import agtor.data_interface.file_loader as file_loader
+
+    crop_dir = f"{data_dir}crops/"
+    expected = load_yaml(crop_dir, cpus=1)
+
+    monkeypatch.setattr(file_loader, 'PARALLEL_MIN_FILES', 1)
+    assert load_yaml(crop_dir, cpus=2) == expected
+
+
+def test_spec_cache(tmp_path, monkeypatch):
+    import agtor.data_interface.file_loader as file_loader
+
+    spec_dir = tmp_path / 'crops'
+    spec_dir.mkdir()
+    for fn in ['irrigated_wheat.yml', 'irrigated_barley.yml']:
+        (spec_dir / fn).write_text(open(f"{data_dir}crops/{fn}").read())
+
+    cache_dir = str(tmp_path / 'cache')
+    expected = load_yaml(str(spec_dir))
+    assert load_yaml(str(spec_dir), cache_dir=cache_dir) == expected
+
+    # Unmodified files are not parsed again
+    parsed = []
+    ingest = file_loader.ingest_data
+    monkeypatch.setattr(file_loader, 'ingest_data', lambda fn: parsed.append(fn) or ingest(fn))
+
+    cached = load_yaml(str(spec_dir), cache_dir=cache_dir)
+    assert cached == expected and parsed == []
+
+    # Specifications are not shared between loads
+    cached['irrigated_wheat']['name'] = 'changed'
+    assert load_yaml(str(spec_dir), cache_dir=cache_dir) == expected
+
+    # Modified files are parsed again
+    tgt = spec_dir / 'irrigated_barley.yml'
+    tgt.write_text(tgt.read_text().replace('irrigated_barley', 'irrigated_barley_v2'))
+    reloaded = load_yaml(str(spec_dir), cache_dir=cache_dir)
+    assert parsed == [str(tgt)]
+    assert 'irrigated_barley_v2' in reloaded and 'irrigated_barley' not in reloaded
+    assert reloaded['irrigated_wheat'] == expected['irrigated_wheat']
+
+
+def test_spec_bundle(tmp_path):
+    import pickle
+    from agtor import load_specs
+
+    spec_dirs = {k: f"{data_dir}{k}/" for k in 
+                 ['crops', 'irrigations', 'pumps', 'water_sources', 'fields']}
+    expected = load_specs(spec_dirs)
+
+    path = str(tmp_path / 'scenario.bundle')
+    bundle_spec_dirs(spec_dirs, path)
+    assert load_specs(path) == expected
+
+    with SpecBundle(path) as bundle:
+        assert bundle.component_types == list(spec_dirs)
+        assert bundle.names('fields') == ['field1', 'field2']
+
+        # Only referenced components are read
+        selected = bundle.select({'fields': ['field2'], 'pumps': ['groundwater']})
+        assert selected == {'fields': {'field2': expected['fields']['field2']},
+                            'pumps': {'groundwater': expected['pumps']['groundwater']}}
+
+        # Each request gives a new copy
+        crop = bundle.get('crops', 'irrigated_wheat')
+        crop['name'] = 'changed'
+        assert bundle.get('crops', 'irrigated_wheat') == expected['crops']['irrigated_wheat']
+
+        with pytest.raises(KeyError):
+            bundle.get('crops', 'missing')
+
+        reopened = pickle.loads(pickle.dumps(bundle))
+        assert reopened.load('pumps') == expected['pumps']
+        reopened.close()
+    # End with
+
+    not_bundle = tmp_path / 'field1.yml'
+    not_bundle.write_text(open(f"{data_dir}fields/field1.yml").read())
+    with pytest.raises(ValueError):
+        SpecBundle(str(not_bundle))
+
+
 @pytest.mark.dependency(depends=["test_spec_loading"])
 def test_load_crop_data():
     crop_data = setup_data()
@@ -54,6 +348,54 @@ def test_load_nominal():
         break
 
 
+def test_crop_stages():
+    crop_data = setup_data()
+    crop = Crop.create(crop_data['irrigated_wheat'])
+
+    sow = pd.to_datetime('1981-05-25')
+    crop.update_stages(sow)
+
+    # Initial stage lasts 30 days after sowing, followed by development
+    assert crop.get_stage(sow) == 0
+    assert crop.get_stage(sow + pd.DateOffset(days=30)) == 0
+    assert crop.get_stage(sow + pd.DateOffset(days=31)) == 1
+    assert crop.get_stage_coefs(sow + pd.DateOffset(days=31)) is crop.growth_stages['development']
+    assert crop.get_stage(sow.toordinal() + 31) == 1
+    assert crop.crop_coefficient(sow + pd.DateOffset(days=31)) == 0.2
+
+    # Initial stage outside of season
+    assert crop.get_stage(sow - pd.DateOffset(days=1)) == 0
+    assert crop.get_stage(sow + pd.DateOffset(days=400)) == 0
+    assert crop.get_stage(None) == 0
+    assert crop.crop_coefficient(None) == 0.15
+    assert crop.depletion_fraction(None) == 0.55
+# End test_crop_stages()
+
+
+def test_nested_param_ids():
+    from copy import deepcopy
+
+    data = setup_data()['irrigated_wheat']
+    crop = Crop.create(deepcopy(data))
+    prefix = f"Crop___{crop.name}__growth_stages"
+
+    # Ids of growth stage values are unique to each stage
+    stages = crop.growth_stages
+    assert stages['initial']['stage_length'].name == f"{prefix}__initial__stage_length"
+    names = [v.name for stage in stages.values() for v in stage.values()]
+    assert len(set(names)) == len(names)
+
+    crop = Crop.create(deepcopy(data), {f"{prefix}__late__stage_length": 40})
+    assert crop.get_nominal(crop.growth_stages['late']['stage_length']) == 40
+    assert crop.get_nominal(crop.growth_stages['initial']['stage_length']) == 30
+
+    # Ids without the name of the growth stage are still accepted
+    with pytest.warns(DeprecationWarning):
+        crop = Crop.create(deepcopy(data), {f"{prefix}____stage_length": 35})
+    assert crop.get_nominal(crop.growth_stages['initial']['stage_length']) == 35
+# End test_nested_param_ids()
+
+
 @pytest.mark.dependency(depends=["test_spec_loading"])
 def test_sampling():
     from ema_workbench.em_framework.samplers import LHSSampler
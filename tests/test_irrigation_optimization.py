@@ -180,6 +180,236 @@ def test_no_required_irrigation():
         """.format(opt, expected, opt_results)
 # End test_no_required_irrigation()
 
+@pytest.mark.dependency(depends=["test_manual_setup"])
+def test_trivial_irrigation():
+    z1, channel_water, deeplead = setup_zone()
+
+    Farmer = Manager()
+    opt_results = Farmer.optimize_irrigated_area(z1)
+    for f in z1.fields:
+        f.irrigated_area = Farmer.get_optimum_irrigated_area(f, opt_results)
+        f.soil_SWD = 80.0
+
+    dt = pd.to_datetime('1981-01-01')
+    solved, solved_cost = Farmer.optimize_irrigation(z1, dt)
+    assert Farmer.stats['bypassed'] == 0
+
+    # No required water
+    for f in z1.fields:
+        f.soil_SWD = 0.0
+
+    zero, zero_cost = Farmer.optimize_irrigation(z1, dt)
+    assert list(zero.keys()) == list(solved.keys())
+    assert list(zero_cost.keys()) == list(solved_cost.keys())
+    assert sum(zero.values()) == 0.0
+    assert Farmer.stats['bypassed'] == 1
+
+    # No allocation
+    for f in z1.fields:
+        f.soil_SWD = 80.0
+    z1.water_sources['surface_water'].allocation = 0.0
+    z1.water_sources['groundwater'].allocation = 0.0
+
+    zero, _ = Farmer.optimize_irrigation(z1, dt)
+    assert list(zero.keys()) == list(solved.keys())
+    assert sum(zero.values()) == 0.0
+    assert Farmer.stats['bypassed'] == 2
+
+    # All fields are dryland
+    z1.water_sources['surface_water'].allocation = 100.0
+    z1.fields[0].irrigation.name = 'dryland'
+
+    zero, zero_cost = Farmer.optimize_irrigation(z1, dt)
+    assert sum(zero.values()) == 0.0
+    assert len(zero_cost) == 0
+    assert Farmer.stats['bypassed'] == 3
+    assert Farmer.stats['solved'] == 2
+# End test_trivial_irrigation()
+
+
+@pytest.mark.dependency(depends=["test_manual_setup"])
+def test_persistent_model():
+    z1, channel_water, deeplead = setup_zone()
+
+    Farmer = Manager(solver='optlang')
+    opt_results = Farmer.optimize_irrigated_area(z1)
+    for f in z1.fields:
+        f.irrigated_area = Farmer.get_optimum_irrigated_area(f, opt_results)
+        f.soil_SWD = 80.0
+
+    dt = pd.to_datetime('1981-01-01')
+    first, _ = Farmer.optimize_irrigation(z1, dt)
+    models = list(Farmer.solver._models.values())
+
+    # Model is reused and updated with the new zone state
+    z1.water_sources['surface_water'].allocation = 10.0
+    second, _ = Farmer.optimize_irrigation(z1, dt)
+    assert list(Farmer.solver._models.values()) == models
+    assert sum(second.values()) < sum(first.values())
+
+    # Results match a freshly created manager
+    fresh, _ = Manager(solver='optlang').optimize_irrigation(z1, dt)
+    assert list(fresh.items()) == list(second.items())
+# End test_persistent_model()
+
+
+@pytest.mark.dependency(depends=["test_manual_setup"])
+def test_indexed_results():
+    z1, channel_water, deeplead = setup_zone()
+
+    # One field name is a substring of the other
+    z1.fields[1].name = 'field10'
+
+    Farmer = Manager()
+    opt_results = Farmer.optimize_irrigated_area(z1)
+    for f in z1.fields:
+        f.irrigated_area = Farmer.get_optimum_irrigated_area(f, opt_results)
+        assert f.irrigated_area == sum([opt_results[f"{f.name}__{ws_name}"]
+                                        for ws_name in z1.water_sources])
+        f.soil_SWD = 80.0
+    # End for
+
+    dt = pd.to_datetime('1981-01-01')
+    opt_results, cost = Farmer.optimize_irrigation(z1, dt)
+    assert opt_results.array.shape == (2, 2)
+    assert list(opt_results.keys()) == sorted(opt_results.keys())
+
+    for f in z1.fields:
+        split = Farmer.perc_irrigation_sources(f, z1.water_sources, opt_results)
+        for ws_name in z1.water_sources:
+            key = f"{f.name}__{ws_name}"
+            assert split[ws_name] == opt_results[key] / f.irrigated_area
+            assert cost.value(f.name, ws_name) == cost[key]
+        # End for
+    # End for
+# End test_indexed_results()
+
+
+def test_cached_application_costs():
+    z1, channel_water, deeplead = setup_zone()
+    Farmer = Manager()
+    field = z1.fields[0]
+
+    def direct_costs(req):
+        irrig = field.irrigation
+        return {ws_name: (w.source.pump.pumping_costs_per_ML(irrig.flow_rate_Lps, 
+                                                            w.source.head + irrig.head_pressure) * req)
+                         + (w.source.cost_per_ML * req)
+                for ws_name, w in z1.water_sources.items()}
+    # End direct_costs()
+
+    costs = Farmer.ML_water_application_cost(z1, field, 2.5)
+    assert costs == direct_costs(2.5)
+    assert Farmer._application_costs(z1) is Farmer._application_costs(z1)
+
+    # Changes to head and pump parameters are picked up
+    cached = Farmer._application_costs(z1)
+    deeplead.head = 40.0
+    assert Farmer._application_costs(z1) is not cached
+    assert Farmer.ML_water_application_cost(z1, field, 2.5) == direct_costs(2.5)
+    assert Farmer.ML_water_application_cost(z1, field, 2.5)['groundwater'] > costs['groundwater']
+
+    deeplead.pump.cost_per_kW *= 2.0
+    assert Farmer.ML_water_application_cost(z1, field, 2.5) == direct_costs(2.5)
+
+    cached = Farmer._application_costs(z1)
+    Farmer.invalidate_costs()
+    assert Farmer._application_costs(z1) is not cached
+
+    # Costs are recalculated for an equal irrigation system that is a different object
+    from copy import copy
+    field.irrigation = copy(field.irrigation)
+    assert field.irrigation == z1.fields[1].irrigation
+    assert Farmer.ML_water_application_cost(z1, field, 2.5) == direct_costs(2.5)
+
+    # Changes to components of other zones do not discard costs
+    cached = Farmer._application_costs(z1)
+    other, _, other_deeplead = setup_zone()
+    other_deeplead.head = 10.0
+    other.fields[0].irrigation.efficiency = 0.9
+    assert Farmer._application_costs(z1) is cached
+# End test_cached_application_costs()
+
+
+def test_greedy_solver():
+    from agtor import (AllocationStructure, AllocationProblem, 
+                       GreedySolver, OptlangSolver)
+
+    rng = np.random.default_rng(42)
+    greedy, optlang = GreedySolver(), OptlangSolver()
+    problems = []
+    for _ in range(50):
+        num_fields = rng.integers(1, 6)
+        num_ws = rng.integers(1, 4)
+        num_vars = num_fields * num_ws
+        names = [f"field{i}__ws{j}" for i in range(num_fields) for j in range(num_ws)]
+
+        # Per water source limits, as in `Manager.optimize_irrigation()`
+        ws_groups = [list(range(j, num_vars, num_ws)) for j in range(num_ws)]
+
+        # Per field and total limits, as in `Manager.optimize_irrigated_area()`
+        field_groups = [list(range(i * num_ws, (i+1) * num_ws)) for i in range(num_fields)]
+        area_groups = field_groups + [list(range(num_vars))]
+
+        for groups in (ws_groups, area_groups):
+            structure = AllocationStructure(names, groups)
+            assert structure.is_laminar
+
+            problem = AllocationProblem(structure, 
+                                        rng.uniform(-100.0, 500.0, num_vars),
+                                        rng.uniform(0.0, 100.0, num_vars),
+                                        rng.uniform(0.0, 150.0, len(groups)))
+
+            x = greedy.solve(problem)
+            assert np.all(x >= 0.0) and np.all(x <= problem.ub + 1e-9)
+            for g, cap in zip(structure.groups, problem.caps):
+                assert x[g].sum() <= cap + 1e-9
+
+            expected = problem.objective_value(optlang.solve(problem))
+            assert np.isclose(problem.objective_value(x), expected, rtol=1e-7, atol=1e-6)
+
+            # Problems sharing a structure are solved together in batches
+            problems += [problem, AllocationProblem(structure, 
+                                                    rng.uniform(-100.0, 500.0, num_vars),
+                                                    problem.ub, problem.caps)]
+        # End for
+    # End for
+
+    for problem, x in zip(problems, greedy.solve_batch(problems)):
+        assert np.array_equal(x, greedy.solve(problem))
+
+    # Overlapping groups are not laminar, so the greedy solver does not apply
+    structure = AllocationStructure(['a', 'b', 'c'], [[0, 1], [1, 2]])
+    assert not structure.is_laminar
+# End test_greedy_solver()
+
+
+@pytest.mark.dependency(depends=["test_manual_setup"])
+def test_vectorized_field_state():
+    z1, channel_water, deeplead = setup_zone()
+    field1, field2 = z1.fields
+
+    # Fields are views onto zone state
+    field2.soil_SWD = 80.0
+    assert z1._field_state.soil_SWD[1] == 80.0
+    z1.update_SWD(np.array([10.0, 0.0]), np.array([5.0, 100.0]))
+    assert field1.soil_SWD == 15.0
+    assert field2.soil_SWD == field2.soil_TAW
+
+    dt = pd.to_datetime('1981-06-01')
+    expected = [f.calc_required_water(dt) for f in z1.fields]
+    assert np.array_equal(z1.calc_required_water(dt), expected)
+
+    # Changes to crops are picked up
+    field1.soil_SWD = 10.0
+    assert z1.calc_required_water(dt)[0] == 0.0
+    field1.crop.root_depth_m = 0.1
+    expected = [f.calc_required_water(dt) for f in z1.fields]
+    assert np.array_equal(z1.calc_required_water(dt), expected)
+    assert expected[0] > 0.0
+# End test_vectorized_field_state()
+
+
 if __name__ == '__main__':
     test_manual_setup()
     test_naive_management()
@@ -1,16 +1,22 @@
 from agtor import (Irrigation, Pump, Crop, 
-                   CropField, FarmZone, WaterSource, Manager, Climate)
+                   CropField, FarmZone, WaterSource, Manager, Climate, load_specs,
+                   Catchment, ZoneCoupling)
 from agtor.data_interface import load_yaml, get_samples
 
+import numpy as np
 import pandas as pd
 
 data_dir = "./tests/data/"
+spec_dirs = {k: f"{data_dir}{k}/" 
+             for k in ('crops', 'irrigations', 'water_sources', 'pumps')}
 
-def setup_zone():
-    climate_dir = f"{data_dir}climate/"  
-    tgt = climate_dir + 'farm_climate_data.csv'
-    data = pd.read_csv(tgt, dayfirst=True, parse_dates=True, index_col=0)
-    climate_data = Climate(data)
+def setup_zone(climate_data=None):
+    if climate_data is None:
+        climate_dir = f"{data_dir}climate/"  
+        tgt = climate_dir + 'farm_climate_data.csv'
+        data = pd.read_csv(tgt, dayfirst=True, parse_dates=True, index_col=0)
+        climate_data = Climate(data)
+    # End if
 
     crop_dir = f"{data_dir}crops/"
     crop_data = load_yaml(crop_dir)
@@ -57,6 +63,13 @@ def setup_zone():
     return z1, w_specs
 # End setup_zone()
 
+
+def reset_allocation(zone, dt):
+    zone.water_sources['groundwater'].allocation = 50.0
+    zone.water_sources['surface_water'].allocation = 125.0
+# End reset_allocation()
+
+
 def test_short_run():
     z1, (deeplead, channel_water) = setup_zone()
 
@@ -89,5 +102,429 @@ def test_short_run():
 # End test_short_run()
 
 
+def test_event_driven_run():
+    results = {}
+    soil_SWD = {}
+    for event_driven in (False, True):
+        z1, _ = setup_zone()
+        farmer = Manager()
+
+        time_sequence = z1.climate.time_steps[0:(365*3)]
+        results[event_driven] = z1.run(farmer, time_sequence, 
+                                       event_driven=event_driven,
+                                       on_date={(5, 15): reset_allocation})
+        soil_SWD[event_driven] = [f.soil_SWD for f in z1.fields]
+    # End for
+
+    assert len(results[True]) > 0
+    assert results[True] == results[False], \
+        "Event-driven run did not match daily run"
+    assert soil_SWD[True] == soil_SWD[False]
+# End test_event_driven_run()
+
+
+def test_cached_solutions():
+    z1, _ = setup_zone()
+    time_sequence = z1.climate.time_steps[0:(365*2)]
+    expected = z1.run(Manager(), time_sequence, 
+                      on_date={(5, 15): reset_allocation})
+
+    # Repeated runs reuse solutions from the first
+    farmer = Manager(cache_size=256)
+    for i in range(2):
+        z1, _ = setup_zone()
+        results = z1.run(farmer, time_sequence, 
+                         on_date={(5, 15): reset_allocation})
+        assert results == expected
+    # End for
+
+    stats = farmer.cache.stats
+    assert stats['hits'] >= stats['misses'] > 0
+    assert farmer.stats['solved'] == stats['misses']
+# End test_cached_solutions()
+
+
+def test_frozen_components():
+    import pickle
+    from ema_workbench import Constant, RealParameter
+
+    z1, _ = setup_zone()
+    time_sequence = z1.climate.time_steps[0:(365*2)]
+
+    # Daily run without freezing components
+    expected = []
+    for dt in time_sequence:
+        if (dt.month == 5) and (dt.day == 15):
+            reset_allocation(z1, dt)
+        # End if
+
+        res = z1.run_timestep(Manager(), dt)
+        if res is not None:
+            expected.append(res)
+    # End for
+
+    z1, _ = setup_zone()
+    crop = z1.fields[0].crop
+    assert isinstance(crop.params['yield_per_ha'], (Constant, RealParameter))
+
+    z1.freeze()
+    assert isinstance(crop, Crop) and crop._frozen
+    assert type(crop).__getattribute__ is object.__getattribute__
+    assert isinstance(object.__getattribute__(crop, 'yield_per_ha'), float)
+    assert isinstance(crop.params['yield_per_ha'], (Constant, RealParameter))
+    assert all(f.irrigation._frozen and f.crop._frozen for f in z1.fields)
+
+    ws = z1.water_sources['groundwater'].source
+    assert ws._frozen and ws.pump._frozen
+
+    copied = pickle.loads(pickle.dumps(ws))
+    assert type(copied) is type(ws)
+    assert copied.cost_per_ML == ws.cost_per_ML
+
+    results = z1.run(Manager(), time_sequence, event_driven=False,
+                     on_date={(5, 15): reset_allocation})
+    assert results == expected
+# End test_frozen_components()
+
+
+def test_compact_components():
+    z1, w_specs = setup_zone()
+    field1, field2 = z1.fields
+
+    for obj in [field1, field1.crop, field1.irrigation, w_specs[0], w_specs[0].pump,
+                z1.water_sources['groundwater'], z1._field_state]:
+        assert not hasattr(obj, '__dict__')
+    # End for
+
+    # Rotation is shared between fields, and cycles through crops
+    assert field1.crop_rotation is field2.crop_rotation
+    first = field1.crop
+    for _ in field1.crop_rotation:
+        field1.set_next_crop()
+    assert field1.crop is first
+    assert field2.crop is first
+# End test_compact_components()
+
+
+def test_field_climate_columns():
+    """Fields only use their own climate columns, e.g. field1 does not use field10 data."""
+    data = pd.read_csv(f"{data_dir}climate/farm_climate_data.csv", 
+                       dayfirst=True, parse_dates=True, index_col=0)
+    similar = data.assign(field10_rainfall=data['field1_rainfall'] * 100.0,
+                          field10_ET=data['field1_ET'] * 100.0)
+
+    results = []
+    for climate_data in (data, similar):
+        z1, _ = setup_zone(Climate(climate_data))
+        time_steps = z1.climate.time_steps[0:(365*2)]
+        results.append(z1.run(Manager(), time_steps, on_date={(5, 15): reset_allocation}))
+    # End for
+
+    assert len(results[0]) > 0
+    assert results[0] == results[1]
+# End test_field_climate_columns()
+
+
+def test_ordinal_clock():
+    results = {}
+    for use_ordinals in (False, True):
+        z1, _ = setup_zone()
+        results[use_ordinals] = []
+        for dt in z1.climate.time_steps[0:(365*2)]:
+            res = z1.run_timestep(Manager(), dt.toordinal() if use_ordinals else dt)
+            if res is not None:
+                results[use_ordinals].append(res)
+        # End for
+    # End for
+
+    assert len(results[True]) > 0
+    assert results[True] == results[False]
+    for res in results[True]:
+        assert all(isinstance(r['datetime'], pd.Timestamp) for r in res.values())
+
+    # Dates are available as Timestamps for fields in season
+    z1, _ = setup_zone()
+    field = z1.fields[0]
+    assert field.harvest_ordinal is None
+    assert not hasattr(field, 'harvest_date')
+
+    month, day = field.crop.plant_month_day
+    sow = pd.Timestamp(1982, month, day)
+    z1.manage(Manager(), sow)
+    assert field.plant_date == sow
+    assert field.harvest_date == pd.Timestamp.fromordinal(field.harvest_ordinal)
+    assert field.harvest_ordinal == sow.toordinal() + field.crop.harvest_days
+# End test_ordinal_clock()
+
+
+def build_zone(specs, climate, override):
+    """Zone built from specifications, for ensemble runs."""
+    crop_rotation = [Crop.create(data, override) for data in specs['crops'].values()]
+    irrig = Irrigation.create(specs['irrigations']['gravity'], override)
+
+    w_specs = []
+    for name, ini_head in (('groundwater', 25.0), ('surface_water', 0.0)):
+        ws = WaterSource.create(specs['water_sources'][name], override)
+        ws.pump = Pump.create(specs['pumps'][name], override)
+        ws.head = ini_head
+        w_specs.append(ws)
+    # End for
+
+    field1 = CropField('field1', 100.0, irrig, crop_rotation, 100.0, 20.0, 100.0)
+    field2 = CropField('field2', 90.0, irrig, crop_rotation, 100.0, 30.0, 90.0)
+
+    return FarmZone('Zone_1', climate=climate, fields=[field1, field2],
+                    water_sources=w_specs,
+                    allocation={'surface_water': 225.0, 'groundwater': 50.0})
+# End build_zone()
+
+
+def setup_samples(num_samples):
+    """Zone and samples of its crop parameters, for ensemble runs."""
+    from agtor.data_interface import sort_param_types
+    from ema_workbench.em_framework.samplers import LHSSampler
+
+    z1, _ = setup_zone()
+    crop = z1.fields[0].crop
+    unc, cats, consts = sort_param_types(crop.params, unc=[], cats=[], consts=[])
+    samples = get_samples((unc, cats, []), num_samples, LHSSampler())
+
+    return z1, samples
+# End setup_samples()
+
+
+def test_ensemble_run():
+    from agtor import run_ensemble
+
+    z1, samples = setup_samples(5)
+
+    time_steps = z1.climate.time_steps[0:(365*2)]
+    opts = dict(time_steps=time_steps, on_date={(5, 15): reset_allocation})
+    serial = run_ensemble(build_zone, spec_dirs, z1.climate, samples, cpus=1, **opts)
+    pooled = run_ensemble(build_zone, spec_dirs, z1.climate, samples, 
+                          cpus=2, chunksize=2, timeout=120, **opts)
+
+    assert len(pooled) == len(samples)
+    assert pooled == serial
+
+    # Each run uses the values in its sample
+    assert serial[0] != serial[1]
+    expected = build_zone(load_specs(spec_dirs), z1.climate, samples.iloc[3].to_dict())
+    assert serial[3] == expected.run(Manager(), **opts)
+# End test_ensemble_run()
+
+
+def test_zone_template():
+    import warnings
+    import pytest
+    from agtor import ZoneTemplate, run_ensemble
+
+    z1, samples = setup_samples(4)
+
+    specs = load_specs(spec_dirs)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        template = ZoneTemplate.from_specs(build_zone, specs, z1.climate, samples.columns)
+    # End with
+    assert template.parameters == list(samples.columns)
+
+    time_steps = z1.climate.time_steps[0:(365*2)]
+    opts = dict(time_steps=time_steps, on_date={(5, 15): reset_allocation})
+    for i, row in enumerate(samples.to_numpy()):
+        zone = template.build(row)
+        expected = build_zone(load_specs(spec_dirs), z1.climate, samples.iloc[i].to_dict())
+        assert zone.run(Manager(), **opts) == expected.run(Manager(), **opts)
+    # End for
+
+    # Shared components and climate data remain shared
+    zone = template.build(samples.iloc[0])
+    f1, f2 = zone.fields
+    assert f1.crop_rotation is f2.crop_rotation
+    assert f1.irrigation is f2.irrigation
+    assert zone.climate is z1.climate
+    assert template.build(samples.iloc[0]).fields[0].crop is not f1.crop
+
+    with pytest.raises(ValueError):
+        template.build(samples.iloc[0, 1:])
+
+    with pytest.warns(UserWarning):
+        ZoneTemplate.from_specs(build_zone, specs, z1.climate, 
+                                list(samples.columns) + ['Crop___unknown'])
+
+    compiled = run_ensemble(build_zone, spec_dirs, z1.climate, samples, 
+                            cpus=1, template=True, **opts)
+    assert compiled == run_ensemble(build_zone, spec_dirs, z1.climate, samples, cpus=1, **opts)
+# End test_zone_template()
+
+
+def test_parameter_registry():
+    from agtor import ParameterRegistry
+
+    z1, samples = setup_samples(3)
+    crop = z1.fields[0].crop
+
+    override = samples.iloc[0].to_dict()
+    override['type___gravity__efficiency'] = 0.8
+    override[f'Crop___{crop.name}__growth_stages__initial__stage_length'] = 35.0
+
+    time_steps = z1.climate.time_steps[0:(365*2)]
+    opts = dict(time_steps=time_steps, on_date={(5, 15): reset_allocation})
+    expected = build_zone(load_specs(spec_dirs), z1.climate, dict(override)).run(Manager(), **opts)
+
+    zone = build_zone(load_specs(spec_dirs), z1.climate, {})
+    registry = ParameterRegistry.from_zones(zone)
+
+    # Slots are stable for zones built from the same specifications
+    other = ParameterRegistry.from_zones(build_zone(load_specs(spec_dirs), z1.climate, {}))
+    assert registry.names == other.names
+    assert len(set(registry.names)) == len(registry)
+
+    # Components read values from the registry
+    crop = zone.fields[0].crop
+    slot = registry.slot(f'Crop___{crop.name}__properties__yield_per_ha')
+    assert crop.yield_per_ha == registry.values[slot]
+    harvest_days = crop.harvest_days
+    initial_length = crop.get_nominal(crop.growth_stages['initial']['stage_length'])
+
+    changed = registry.load(registry.vector(override))
+    assert len(changed) == len(override)
+    assert crop.yield_per_ha == override[f'Crop___{crop.name}__properties__yield_per_ha']
+    assert crop.harvest_days == harvest_days + (35 - initial_length)
+    assert zone.run(Manager(), **opts) == expected
+
+    # Values of frozen components are updated in place
+    zone = build_zone(load_specs(spec_dirs), z1.climate, {})
+    registry = ParameterRegistry.from_zones(zone)
+    zone.freeze()
+    registry.load(registry.align(pd.DataFrame([override]))[0])
+    assert zone.fields[0].irrigation.efficiency == 0.8
+    assert zone.run(Manager(), **opts) == expected
+
+    # Parameters of field state are registered, for unfrozen and frozen fields
+    from ema_workbench import RealParameter
+    for freeze in (False, True):
+        zone = build_zone(load_specs(spec_dirs), z1.climate, {})
+        field = zone.fields[0]
+        field.total_area_ha = RealParameter('CropField___field1__total_area_ha', 
+                                            50.0, 150.0, default=100.0)
+        if freeze:
+            zone.freeze()
+
+        registry = ParameterRegistry.from_zones(zone)
+        assert 'CropField___field1__total_area_ha' in registry
+
+        registry.load(registry.vector({'CropField___field1__total_area_ha': 120.0}))
+        assert field.total_area_ha == 120.0
+        assert zone.total_area_ha == 120.0 + zone.fields[1].total_area_ha
+    # End for
+# End test_parameter_registry()
+
+
+def test_batch_run():
+    from agtor import ZoneBatch
+
+    z1, samples = setup_samples(6)
+    samples = samples.to_dict(orient='records')
+
+    time_steps = z1.climate.time_steps[0:(365*3)]
+    opts = dict(on_date={(5, 15): reset_allocation})
+    expected = [build_zone(load_specs(spec_dirs), z1.climate, dict(row)).run(Manager(), time_steps, **opts)
+                for row in samples]
+
+    zones = [build_zone(load_specs(spec_dirs), z1.climate, dict(row)) for row in samples]
+    batch = ZoneBatch(zones)
+    results = batch.run(Manager(), time_steps, **opts)
+
+    assert len(results) == len(samples)
+    assert results == expected
+    assert results[0] != results[1]
+
+    # Field state of each zone is a view onto the batch state
+    soil_SWD = batch.state('soil_SWD')
+    assert soil_SWD.shape == (len(zones), len(z1.fields))
+    assert soil_SWD[2, 1] == zones[2].fields[1].soil_SWD
+    assert batch.allocation.shape == (len(zones), len(z1.water_sources))
+
+    # Water requirements match those of each zone, including after crop changes
+    crop = zones[2].fields[1].crop
+    t = crop._sow_ordinal + 30
+    zones[2].fields[1].soil_SWD = 10.0
+    for i in range(2):
+        required = batch.calc_required_water(t)
+        for z, req in zip(zones, required):
+            assert np.array_equal(req, z.calc_required_water(t))
+        # End for
+
+        crop.root_depth_m = 0.1
+    # End for
+    assert required[2, 1] > 0.0
+# End test_batch_run()
+
+
+class TransferCoupling(ZoneCoupling):
+
+    """Moves a share of remaining surface water from each zone to the next."""
+
+    def collect(self, zone, dt):
+        return zone.water_sources['surface_water'].allocation
+    # End collect()
+
+    def exchange(self, states, dt):
+        names = list(states)
+        return {names[(i+1) % len(names)]: states[name] * 0.01 for i, name in enumerate(names)}
+    # End exchange()
+
+    def apply(self, zone, update, dt):
+        zone.water_sources['surface_water'].allocation += update
+    # End apply()
+
+# End TransferCoupling()
+
+
+def test_catchment_run():
+    climate = setup_zone()[0].climate
+
+    def setup_catchment():
+        zones = []
+        for i in range(3):
+            z, _ = setup_zone(climate)
+            z.name = f"Zone_{i}"
+            for w in z.water_sources.values():
+                w.allocation *= (i + 1)
+            zones.append(z)
+        # End for
+
+        return Catchment(zones, {z.name: Manager() for z in zones})
+    # End setup_catchment()
+
+    time_steps = climate.time_steps[0:(365*2)]
+    opts = dict(on_date={(5, 15): reset_allocation})
+
+    expected = {}
+    serial = setup_catchment()
+    for z in serial.zones:
+        expected[z.name] = z.run(Manager(), time_steps, **opts)
+    # End for
+
+    # Zones are independent without coupling
+    catchment = setup_catchment()
+    results = catchment.run(time_steps, cpus=2, **opts)
+    assert list(results) == ['Zone_0', 'Zone_1', 'Zone_2']
+    assert results == expected
+
+    # Zones hold their final state
+    for z, serial_z in zip(catchment.zones, serial.zones):
+        assert z.climate is climate
+        assert [f.soil_SWD for f in z.fields] == [f.soil_SWD for f in serial_z.fields]
+    # End for
+
+    # Coupled zones give the same results in serial and in parallel
+    coupled = setup_catchment().run(time_steps, cpus=1, coupling=TransferCoupling(), **opts)
+    assert coupled != expected
+    assert setup_catchment().run(time_steps, cpus=2, coupling=TransferCoupling(), **opts) == coupled
+    assert setup_catchment().run(time_steps, cpus=2, coupling=ZoneCoupling(), **opts) == expected
+# End test_catchment_run()
+
+
 if __name__ == '__main__':
     test_short_run()